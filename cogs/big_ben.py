@@ -1,11 +1,136 @@
+import concurrent.futures
+import io
+import math
+import multiprocessing
+import time
 import typing
+from array import array
+from datetime import datetime as dt, timedelta, timezone
 
 import discord
 from discord.ext import commands, vbu
 
+from cogs import utils
+
 
 class BigBen(vbu.Cog):
 
+    BONGCOUNT_PERIODS: typing.Dict[str, typing.Tuple[str, typing.Optional[timedelta]]] = {
+        "week": ("in the last 7 days", timedelta(days=7)),
+        "month": ("in the last 30 days", timedelta(days=30)),
+        "all": ("", None),
+    }  # value: (description, lookback)
+
+    LEADERBOARD_SCOPES: typing.Dict[str, str] = {
+        "guild": "on this server",
+        "global": "across every server",
+    }  # value: description
+
+    LEADERBOARD_PAGE_QUERIES: typing.Dict[str, typing.Tuple[str, str]] = {
+        "guild": (
+            """SELECT user_id, count FROM bong_counts WHERE guild_id=$1
+            ORDER BY count DESC, user_id DESC LIMIT $2 OFFSET $3""",
+            """SELECT user_id, count FROM bong_counts WHERE guild_id=$1 AND (count, user_id) < ($3, $4)
+            ORDER BY count DESC, user_id DESC LIMIT $2""",
+        ),
+        "global": (
+            """SELECT user_id, count FROM bong_user_counts
+            ORDER BY count DESC, user_id DESC LIMIT $1 OFFSET $2""",
+            """SELECT user_id, count FROM bong_user_counts WHERE (count, user_id) < ($2, $3)
+            ORDER BY count DESC, user_id DESC LIMIT $1""",
+        ),
+    }  # value: (first page query, keyset query)
+
+    LEADERBOARD_SIZE_QUERIES: typing.Dict[str, str] = {
+        "guild": """SELECT COALESCE(SUM(users), 0) AS count FROM bong_count_histogram WHERE guild_id=$1""",
+        "global": """SELECT COALESCE(SUM(users), 0) AS count FROM bong_user_count_histogram""",
+    }  # Read from the histograms, so they only look at one row per distinct count
+
+    LEADERBOARD_RANK_QUERIES: typing.Dict[str, str] = {
+        "guild": """SELECT user_count.count, (
+                SELECT COALESCE(SUM(ahead.users), 0) FROM bong_count_histogram ahead
+                WHERE ahead.guild_id=$1 AND ahead.count > user_count.count
+            ) + 1 AS position, (
+                SELECT tied.users FROM bong_count_histogram tied
+                WHERE tied.guild_id=$1 AND tied.count = user_count.count
+            ) - 1 AS tied
+            FROM bong_counts user_count WHERE user_count.guild_id=$1 AND user_count.user_id=$2""",
+        "global": """SELECT user_count.count, (
+                SELECT COALESCE(SUM(ahead.users), 0) FROM bong_user_count_histogram ahead
+                WHERE ahead.count > user_count.count
+            ) + 1 AS position, (
+                SELECT tied.users FROM bong_user_count_histogram tied
+                WHERE tied.count = user_count.count
+            ) - 1 AS tied
+            FROM bong_user_counts user_count WHERE user_count.user_id=$1""",
+    }  # Everyone with more bongs than the user, with ties sharing a rank
+
+    def __init__(self, bot: vbu.Bot):
+        super().__init__(bot)
+        bong_config = self.bot.config.get("bong", {})
+        self.chart_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=bong_config.get("chart_workers", 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.chart_cache = utils.LRUCache("bongdist", max_size=bong_config.get("chart_cache_size", 128))
+        # Rendered bongdist charts, by (guild ID, user ID)
+
+        self.bongcount_cache = utils.LRUCache("bongcount", max_size=bong_config.get("bongcount_cache_size", 1_024))
+        # Bongcount stats, by (guild ID, user ID, period)
+
+        self.leaderboard_cache = utils.LRUCache("leaderboard", max_size=bong_config.get("leaderboard_cache_size", 1_024))
+        self.leaderboard_sizes = utils.LRUCache("leaderboard_size", max_size=bong_config.get("leaderboard_cache_size", 1_024))
+        # Leaderboard pages, by (guild ID or None, page number), and how many users are on each leaderboard
+
+        self.global_leaderboard_max_age = bong_config.get("global_leaderboard_max_age", 60.0)
+        # A guild's wins all come through the process with its shard, but the global leaderboard gets
+        # wins from every process - so it can only be cached for a while rather than until the next win
+
+    def cog_unload(self):
+        self.chart_pool.shutdown(wait=False)
+
+    @vbu.Cog.listener("on_bong_log_written")
+    async def update_bong_caches(self, rows: typing.List[typing.Tuple[int, int, dt, dt, typing.Optional[int]]]):
+        """
+        Keep the cached stats up to date with new bong winners. Only the winners'
+        own stats and their guilds' leaderboards (and the global leaderboard) change.
+        """
+
+        winners = {(guild_id, user_id,) for guild_id, user_id, *_ in rows}
+        guild_ids = {i[0] for i in winners}
+        self.chart_cache.invalidate(lambda key: key in winners)
+        self.bongcount_cache.invalidate(lambda key: key[:2] in winners)
+        self.leaderboard_cache.invalidate(lambda key: key[0] is None or key[0] in guild_ids)
+        self.leaderboard_sizes.invalidate(lambda key: key is None or key in guild_ids)
+
+    def get_leaderboard_expiry(self, guild_id: typing.Optional[int]) -> typing.Optional[float]:
+        """
+        Get when a cached leaderboard entry should expire - only the global
+        leaderboard ever does.
+        """
+
+        if guild_id is None:
+            return time.time() + self.global_leaderboard_max_age
+        return None
+
+    async def get_leaderboard_size(self, guild_id: typing.Optional[int]) -> int:
+        """
+        Get how many users are on a guild's leaderboard, or on the global
+        leaderboard if the guild is ``None``.
+        """
+
+        size = self.leaderboard_sizes.get(guild_id)
+        if size is not None:
+            return size
+        async with utils.timed_database(self.bot.database) as db:
+            if guild_id is None:
+                rows = await db(self.LEADERBOARD_SIZE_QUERIES["global"])
+            else:
+                rows = await db(self.LEADERBOARD_SIZE_QUERIES["guild"], guild_id)
+        size = rows[0]['count']
+        self.leaderboard_sizes.set(guild_id, size, expires_at=self.get_leaderboard_expiry(guild_id))
+        return size
+
     @commands.command(
         application_command_meta=commands.ApplicationCommandMeta()
     )
@@ -27,14 +152,29 @@ class BigBen(vbu.Cog):
                     description="The user whose bong count you want to check.",
                     required=False,
                     type=discord.ApplicationCommandOptionType.user,
-                )
+                ),
+                discord.ApplicationCommandOption(
+                    name="period",
+                    description="The time period to count bongs over.",
+                    required=False,
+                    type=discord.ApplicationCommandOptionType.string,
+                    choices=[
+                        discord.ApplicationCommandOptionChoice(name="Last 7 days", value="week"),
+                        discord.ApplicationCommandOptionChoice(name="Last 30 days", value="month"),
+                        discord.ApplicationCommandOptionChoice(name="All time", value="all"),
+                    ],
+                ),
             ]
         )
     )
     @commands.defer()
     @commands.bot_has_permissions(send_messages=True)
     @commands.guild_only()
-    async def bongcount(self, ctx: vbu.SlashContext, user: typing.Optional[discord.Member] = None):
+    async def bongcount(
+            self,
+            ctx: vbu.SlashContext,
+            user: typing.Optional[discord.Member] = None,
+            period: typing.Optional[str] = None):
         """
         Counts how many times a user has gotten the first bong reaction.
         """
@@ -43,79 +183,221 @@ class BigBen(vbu.Cog):
         user = user or ctx.author  # type: ignore
         assert user  # Make sure it's actually set
 
-        # Get the data we need
-        async with self.bot.database() as db:
-            rows = await db("SELECT * FROM bong_log WHERE guild_id=$1 AND user_id=$2", ctx.interaction.guild_id, user.id)
+        # Work out what time period we're looking at
+        period = period if period in self.BONGCOUNT_PERIODS else "all"
+        period_text, lookback = self.BONGCOUNT_PERIODS[period]
+        key = (ctx.interaction.guild_id, user.id, period,)
+
+        # Get the data we need - months that have been rolled up are older than any period,
+        # so they only need including when we're looking at all time
+        stats = self.bongcount_cache.get(key)
+        if stats is None:
+            since = dt.utcnow() - lookback if lookback else None
+            async with utils.timed_database(self.bot.database) as db:
+                rows = await db(
+                    """SELECT
+                        COUNT(*) AS count,
+                        AVG(reaction_time) AS mean,
+                        MIN(reaction_time) AS best,
+                        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY reaction_time) AS median,
+                        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY reaction_time) AS p90,
+                        MIN(timestamp) AS oldest
+                    FROM (
+                        SELECT EXTRACT(EPOCH FROM timestamp - message_timestamp)::DOUBLE PRECISION AS reaction_time, timestamp
+                        FROM bong_log
+                        WHERE guild_id=$1 AND user_id=$2 AND ($3::TIMESTAMP IS NULL OR timestamp >= $3)
+                        UNION ALL
+                        SELECT UNNEST(reaction_times) AS reaction_time, NULL::TIMESTAMP AS timestamp
+                        FROM bong_log_rollups
+                        WHERE guild_id=$1 AND user_id=$2 AND $3::TIMESTAMP IS NULL
+                    ) AS reaction_times""",
+                    ctx.interaction.guild_id, user.id, since,
+                )
+            stats = dict(rows[0])
+
+            # Other than a new win, a period's stats only change when its oldest bong drops out of it
+            expires_at = None
+            if lookback and stats['oldest']:
+                expires_at = (stats['oldest'] + lookback).replace(tzinfo=timezone.utc).timestamp()
+            self.bongcount_cache.set(key, stats, expires_at=expires_at)
+        period_text = f" {period_text}" if period_text else ""
 
         # Format and send their data
-        if rows:
-            average = sum([(i['timestamp'] - i['message_timestamp']).total_seconds() for i in rows]) / len(rows)
+        if stats['count']:
             return await ctx.send(
-                f"{user.mention} has gotten the first bong reaction {len(rows)} times, "
-                f"averaging a {average:,.2f}s reaction time."
+                f"{user.mention} has gotten the first bong reaction {stats['count']:,} times{period_text}, "
+                f"averaging a {stats['mean']:,.2f}s reaction time "
+                f"(best {stats['best']:,.2f}s, median {stats['median']:,.2f}s, p90 {stats['p90']:,.2f}s)."
             )
-        return await ctx.send(f"{user.mention} has gotten the first bong reaction 0 times :c")
+        return await ctx.send(f"{user.mention} has gotten the first bong reaction 0 times{period_text} :c")
 
     @commands.command(
         aliases=['lb'],
-        application_command_meta=commands.ApplicationCommandMeta(),
+        application_command_meta=commands.ApplicationCommandMeta(
+            options=[
+                discord.ApplicationCommandOption(
+                    name="scope",
+                    description="Whether to show this server's leaderboard or everyone's.",
+                    required=False,
+                    type=discord.ApplicationCommandOptionType.string,
+                    choices=[
+                        discord.ApplicationCommandOptionChoice(name="This server", value="guild"),
+                        discord.ApplicationCommandOptionChoice(name="Every server", value="global"),
+                    ],
+                ),
+            ]
+        ),
     )
     @commands.defer()
     @commands.bot_has_permissions(send_messages=True, embed_links=True)
     @commands.guild_only()
-    async def leaderboard(self, ctx: vbu.SlashContext):
+    async def leaderboard(self, ctx: vbu.SlashContext, scope: typing.Optional[str] = None):
         """
         Gives you the bong leaderboard.
         """
 
-        async with self.bot.database() as db:
-            rows = await db(
-                """SELECT user_id, count(user_id) FROM bong_log WHERE guild_id=$1 GROUP BY user_id
-                ORDER BY count(user_id) DESC, user_id DESC""",
-                ctx.interaction.guild_id,
-            )
-        if not rows:
+        # Work out which leaderboard we're looking at
+        scope = scope if scope in self.LEADERBOARD_SCOPES else "guild"
+        guild_id = ctx.interaction.guild_id if scope == "guild" else None
+        scope_args = () if guild_id is None else (guild_id,)
+        size = await self.get_leaderboard_size(guild_id)
+        if not size:
+            if guild_id is None:
+                return await ctx.send("Nobody has reacted to the bong message yet :<")
             return await ctx.send("Nobody has reacted to the bong message yet on your server :<")
-        lines = [f"{index}. <@{row['user_id']}> ({row['count']} bongs)" for index, row in enumerate(rows, start=1)]
-        await vbu.Paginator(lines, per_page=10).start(ctx)
-
-
-    # @commands.command(enabled=False)
-    # @commands.bot_has_permissions(send_messages=True, attach_files=True, embed_links=True)
-    # @commands.guild_only()
-    # async def bongdist(self, ctx: vbu.SlashContext, user: discord.Member = None):
-    #     """
-    #     Gives you the bong leaderboard.
-    #     """
-
-    #     user = user or ctx.author
-    #     async with self.bot.database() as db:
-    #         rows = await db("SELECT timestamp - message_timestamp AS reaction_time FROM bong_log WHERE user_id=$1 AND guild_id=$2", user.id, ctx.interaction.guild_id)
-    #     if not rows:
-    #         return await ctx.send(f"{user.mention} has reacted to the bong message yet on your server.")
-
-    #     # Build our output graph
-    #     fig = plt.figure()
-    #     ax = fig.subplots()
-    #     bplot = ax.boxplot([i['reaction_time'].total_seconds() for i in rows], patch_artist=True)
-    #     ax.axis([0, 2, 0, 10])
-
-    #     for i in bplot['boxes']:
-    #         i.set_facecolor('lightblue')
-
-    #     # Fix axies
-    #     ax.grid(True)
-
-    #     # Tighten border
-    #     fig.tight_layout()
-
-    #     # Output to user baybeeee
-    #     fig.savefig('activity.png', bbox_inches='tight', pad_inches=0)
-    #     with vbu.Embed() as embed:
-    #         # Build the embed
-    #         embed = discord.Embed(title=f"{ctx.author.name}'s average reaction time")
-    #         embed.set_image(url="attachment://activity.png")
-    #     await ctx.send(embed=embed, file=discord.File("activity.png"))
+
+        # Fetch each page as it's viewed, carrying on from the last row of the page before
+        per_page = 10
+        first_page_query, keyset_query = self.LEADERBOARD_PAGE_QUERIES[scope]
+        page_ends: typing.Dict[int, typing.Tuple[int, int]] = {}  # page number: (count, user ID) of its last row
+
+        async def get_page(page_number: int) -> typing.List[str]:
+            rows = self.leaderboard_cache.get((guild_id, page_number,))
+            if rows is None:
+                async with utils.timed_database(self.bot.database) as db:
+                    if page_number - 1 in page_ends:
+                        rows = await db(keyset_query, *scope_args, per_page, *page_ends[page_number - 1])
+                    else:
+                        rows = await db(first_page_query, *scope_args, per_page, page_number * per_page)
+                rows = [(i['user_id'], i['count'],) for i in rows]
+                self.leaderboard_cache.set((guild_id, page_number,), rows, expires_at=self.get_leaderboard_expiry(guild_id))
+            if not rows:
+                raise StopAsyncIteration()  # The paginator goes back a page and stops there
+            if len(rows) < per_page:
+                paginator.max_pages = page_number + 1
+            page_ends[page_number] = (rows[-1][1], rows[-1][0],)
+            return [
+                f"{index}. <@{user_id}> ({count} bongs)"
+                for index, (user_id, count) in enumerate(rows, start=(page_number * per_page) + 1)
+            ]
+
+        # The paginator can't tell how many pages a function gives, so we tell it
+        paginator = vbu.Paginator(get_page, per_page=per_page)
+        paginator.max_pages = math.ceil(size / per_page)
+        await paginator.start(ctx)
+
+    @commands.command(
+        application_command_meta=commands.ApplicationCommandMeta(
+            options=[
+                discord.ApplicationCommandOption(
+                    name="user",
+                    description="The user whose rank you want to check.",
+                    required=False,
+                    type=discord.ApplicationCommandOptionType.user,
+                ),
+                discord.ApplicationCommandOption(
+                    name="scope",
+                    description="Whether to rank against this server or everyone.",
+                    required=False,
+                    type=discord.ApplicationCommandOptionType.string,
+                    choices=[
+                        discord.ApplicationCommandOptionChoice(name="This server", value="guild"),
+                        discord.ApplicationCommandOptionChoice(name="Every server", value="global"),
+                    ],
+                ),
+            ]
+        )
+    )
+    @commands.defer()
+    @commands.bot_has_permissions(send_messages=True)
+    @commands.guild_only()
+    async def rank(
+            self,
+            ctx: vbu.SlashContext,
+            user: typing.Optional[discord.Member] = None,
+            scope: typing.Optional[str] = None):
+        """
+        Tells you where a user is on the bong leaderboard.
+        """
+
+        user = user or ctx.author  # type: ignore
+        assert user
+        scope = scope if scope in self.LEADERBOARD_SCOPES else "guild"
+        guild_id = ctx.interaction.guild_id if scope == "guild" else None
+        scope_args = () if guild_id is None else (guild_id,)
+        async with utils.timed_database(self.bot.database) as db:
+            rows = await db(self.LEADERBOARD_RANK_QUERIES[scope], *scope_args, user.id)
+        if not rows:
+            return await ctx.send(f"{user.mention} hasn't gotten the first bong reaction {self.LEADERBOARD_SCOPES[scope]} yet :c")
+        size = await self.get_leaderboard_size(guild_id)
+        joint = "joint " if rows[0]['tied'] else ""
+        return await ctx.send(
+            f"{user.mention} is ranked {joint}#{rows[0]['position']:,} of {max(size, rows[0]['position']):,} "
+            f"{self.LEADERBOARD_SCOPES[scope]}, with {rows[0]['count']:,} bongs."
+        )
+
+    @commands.command(
+        application_command_meta=commands.ApplicationCommandMeta(
+            options=[
+                discord.ApplicationCommandOption(
+                    name="user",
+                    description="The user whose reaction times you want to see.",
+                    required=False,
+                    type=discord.ApplicationCommandOptionType.user,
+                ),
+            ]
+        )
+    )
+    @commands.defer()
+    @commands.bot_has_permissions(send_messages=True, attach_files=True, embed_links=True)
+    @commands.guild_only()
+    async def bongdist(self, ctx: vbu.SlashContext, user: typing.Optional[discord.Member] = None):
+        """
+        Gives you a chart of a user's bong reaction times.
+        """
+
+        user = user or ctx.author  # type: ignore
+        assert user
+        key = (ctx.interaction.guild_id, user.id,)
+
+        # See if we've already drawn it
+        chart = self.chart_cache.get(key)
+        if chart is None:
+
+            # Get their reaction times as a single array
+            async with utils.timed_database(self.bot.database) as db:
+                rows = await db(
+                    """SELECT ARRAY_AGG(reaction_time::REAL) AS reaction_times FROM (
+                        SELECT EXTRACT(EPOCH FROM timestamp - message_timestamp) AS reaction_time
+                        FROM bong_log WHERE guild_id=$1 AND user_id=$2
+                        UNION ALL
+                        SELECT UNNEST(reaction_times) AS reaction_time
+                        FROM bong_log_rollups WHERE guild_id=$1 AND user_id=$2
+                    ) AS reaction_times""",
+                    *key,
+                )
+            if not rows or not rows[0]['reaction_times']:
+                return await ctx.send(f"{user.mention} hasn't reacted to the bong message yet on your server.")
+            reaction_times = array('f', rows[0]['reaction_times'])
+
+            # Draw the chart somewhere it won't block the bot
+            chart = await self.bot.loop.run_in_executor(self.chart_pool, utils.render_reaction_times, reaction_times)
+            self.chart_cache.set(key, chart)
+
+        # Output to user baybeeee
+        embed = discord.Embed(title=f"{user.display_name}'s bong reaction times")
+        embed.set_image(url="attachment://bongdist.png")
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO(chart), filename="bongdist.png"))
 
 
 def setup(bot: vbu.Bot):
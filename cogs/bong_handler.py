@@ -1,18 +1,18 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime as dt
+from datetime import datetime as dt, date, timedelta
 import re
 import collections
-from typing import Dict, Union, Tuple, Optional
-import typing
+import time
+from typing import Any, Callable, Dict, Iterable, Union, Tuple, Optional
 import random
 
 import discord
 from discord.ext import tasks, vbu
 
-if typing.TYPE_CHECKING:
-    import aiohttp
+from cogs import utils
+from cogs.utils.metrics import REGISTRY
 
 
 class BongHandler(vbu.Cog):
@@ -35,211 +35,647 @@ class BongHandler(vbu.Cog):
         (31, 10): "👻 Spooky Bong 👻",
         (25, 12): "🎅 Christmas Bong 🌲",
 	    (12,2): "⛏️ MOLES MOLES MOLES Bong ☠",
-
-        (12, 4, 2020): "Easter Bong",
-        (4, 4, 2021): "Easter Bong",
-        (17, 4, 2022): "Easter Bong",
-        (9, 4, 2023): "🐇 Easter Bong 🥚",
-        (31, 3, 2024): "🐇 Easter Bong 🥚",
     }  # (DD, MM, YYYY?): Output
+    MOVEABLE_BONG_TEXT: Dict[Callable[[int], date], str] = {
+        utils.easter_date: "🐇 Easter Bong 🥚",
+    }  # Function to get the date for a given year: Output
 
     def __init__(self, bot: vbu.Bot):
         super().__init__(bot)
-        self.last_posted_hour: Optional[int] = None
-        # The last hour of bongs that was posted, used for checking if we should post a new one
-        # `None` is valid as making sure the minute is 0 is also checked
+        bong_config = self.bot.config.get("bong", {})
+        self.bong_scheduler = utils.HourlyScheduler(
+            self.bing_bong,
+            prepare=self.prepare_bong,
+            lead=bong_config.get("prepare_seconds", 2.0),
+            catch_up=bong_config.get("catch_up_seconds", 300.0),
+        )
+        self.bong_scheduler.start()
+        # The bong loop - sleeps until the next guild's local hour
+
+        self.bong_rounds = utils.BongRoundStore(max_age=bong_config.get("round_max_age", 7_200))
+        # The state of each recent bong message - whether it's been claimed, who clicked it, etc
+
+        self.partitioner = utils.BongPartitioner.from_config(self.bot, bong_config.get("partition", {}))
+        # Which guilds this process should be sending bongs to
+
+        journal_path = bong_config.get("round_journal_path", "bong_rounds.{worker}.journal")
+        journal_path = journal_path.format(worker=self.partitioner.worker_name)
+        self.bong_round_journal = utils.BongRoundJournal(journal_path) if journal_path else None
+        if self.bong_round_journal is not None:
+            self.bong_round_journal.restore(self.bong_rounds)
+        # A record of the bong rounds on disk, so a restart partway through the hour can carry on -
+        # rounds from before their guild's current bong period are closed once the roster is loaded
+
+        self.claim_latency = utils.LatencyHistogram()
+        self.response_latency = utils.LatencyHistogram()
+        # How long it takes from getting a click to deciding the winner and to responding, for this round
+
+        self.bong_message_editor = utils.EditCoalescer(interval=bong_config.get("message_edit_interval", 1.0))
+        # Batches up edits to the bong messages so that each click doesn't need its own edit
+
+        self.fun_facts = utils.FunFactPool(
+            size=bong_config.get("fun_fact_pool_size", 5),
+            timeout=bong_config.get("fun_fact_timeout", 5.0),
+        )
+        self.fun_fact_refill.start()
+        # A pool of prefetched fun facts so that sending a bong never waits on the API
+
+        self.webhook_dispatcher = utils.WebhookDispatcher(
+            concurrency=bong_config.get("webhook_concurrency", 50),
+            deadline=bong_config.get("webhook_retry_deadline", 30.0),
+        )
+        # Sends the bong webhooks without going over Discord's ratelimits
+
+        self.webhook_client = utils.WebhookClient(
+            limit=bong_config.get("webhook_pool_size", 100),
+            keepalive=bong_config.get("webhook_keepalive_seconds", 60.0),
+            warm_url=bong_config.get("webhook_warm_url", "https://discord.com/api/v10/gateway"),
+        )
+        self.webhook_warm_connections = bong_config.get("webhook_warm_connections", 20)
+        self.webhook_connections = utils.ConnectionStats()
+        # The bong webhooks' own connection pool, warmed up before each bong, and how
+        # many connections the last round reused
+
+        self.webhook_health = utils.WebhookHealth(
+            threshold=bong_config.get("webhook_failure_threshold", 3),
+            outage_ratio=bong_config.get("webhook_outage_ratio", 0.5),
+        )
+        # Stops sending to webhooks that keep failing
+
+        self.allowed_guild_ids = set(bong_config.get("allowed_guild_ids", self.ALLOWED_GUILD_IDS))
+        # The guilds that are allowed to get bongs - empty means every guild
+
+        self.bong_log_writer = utils.BongLogWriter()
+        for bong_round in self.bong_rounds.unflushed():
+            self.bong_log_writer.add(
+                bong_round.guild_id,
+                bong_round.winner_id,
+                dt.utcfromtimestamp(bong_round.claimed_at),
+                dt.utcfromtimestamp(bong_round.created_at),
+                bong_round.message_id,
+            )
+        self.bong_rounds.evict()
+        self.flush_bong_log.change_interval(seconds=bong_config.get("bong_log_flush_seconds", 5.0))
+        self.flush_bong_log.start()
+        # Bong winners waiting to be written to the database, including any from the journal that
+        # hadn't been written before a restart
 
-        self.bing_bong.start()
-        # The bong loop
+        self.bong_calendar = utils.BongCalendar(self.BONG_TEXT, self.MOVEABLE_BONG_TEXT, self.DEFAULT_BONG_TEXT)
+        # The titles for today's bongs, including each guild's override
 
-        self.current_bong_messages = set()
-        # Messages that the bot posted, used for checking if the button was clicked
+        self.bong_roster = utils.BongRoster()
+        self.bot.loop.create_task(self.load_bong_roster())
+        # The guilds that have bongs set up
+
+        self.register_metrics()
+
+    def database(self):
+        """
+        Get a database connection, recording how long it took to get.
+        """
 
-        self.bong_handle_locks = collections.defaultdict(asyncio.Lock)
-        # A lock instance so we don't handle the same bong twice
+        return utils.timed_database(self.bot.database)
 
-        self.bong_button_clicks = collections.defaultdict(set)
-        # A dict of `message: {user_id, ...}` to count how many clicks the button has
+    def register_metrics(self):
+        """
+        Add gauges for the size of each of our in-memory caches.
+        """
 
-        self.first_button_click = {}
-        # A dict of message_id: username for the first people to click the bong button
+        REGISTRY.gauge_callback("bigben_bong_rounds", lambda: len(self.bong_rounds))
+        REGISTRY.gauge_callback("bigben_bong_round_clicks", lambda: self.bong_rounds.click_count)
+        REGISTRY.gauge_callback("bigben_fun_fact_pool_size", lambda: len(self.fun_facts))
+        REGISTRY.gauge_callback("bigben_bong_log_buffer_size", lambda: len(self.bong_log_writer))
+        REGISTRY.gauge_callback("bigben_pending_message_edits", lambda: len(self.bong_message_editor))
+        REGISTRY.gauge_callback("bigben_bong_title_overrides", lambda: self.bong_calendar.override_count)
+        REGISTRY.gauge_callback("bigben_bong_roster_size", lambda: len(self.bong_roster))
 
     def cog_unload(self):
-        self.bing_bong.cancel()
+        self.bong_scheduler.cancel()
+        self.bong_message_editor.cancel()
+        self.fun_fact_refill.cancel()
+        self.flush_bong_log.stop()  # Not cancelled, so that a flush that's already running finishes
+        self.bot.loop.create_task(self.shutdown())
+        # The bot unloads its cogs before it closes, so this gets a database connection before the pool
+        # starts closing - and the pool waits for it to be given back
+
+    async def shutdown(self):
+        """
+        Write anything left in the bong log buffer, and close the files and
+        connections that the cog holds.
+        """
+
+        await self.write_bong_log()
+        if len(self.bong_log_writer):
+            self.logger.error(f"Shutting down with {len(self.bong_log_writer)} bong log rows unwritten")
+        if self.bong_round_journal is not None:
+            self.bong_round_journal.close()
+        await self.webhook_client.close()
 
-    @tasks.loop(seconds=1)
-    async def bing_bong(self):
+    @tasks.loop(seconds=5)
+    async def flush_bong_log(self):
         """
-        Do the bong.
+        Write any buffered bong winners to the database.
+        """
+
+        await self.write_bong_log()
+
+    async def write_bong_log(self):
+        """
+        Flush the bong log buffer, and mark the written rounds as flushed so that a
+        restart doesn't write them again.
+        """
+
+        rows = await self.bong_log_writer.flush(self.database)
+        if not rows:
+            return
+        message_ids = [i[4] for i in rows if i[4] is not None]
+        for message_id in message_ids:
+            bong_round = self.bong_rounds.get(message_id)
+            if bong_round is not None:
+                bong_round.flushed = True
+        if self.bong_round_journal is not None:
+            self.bong_round_journal.record_flushed(message_ids)
+        self.bot.dispatch("bong_log_written", rows)
+
+    @staticmethod
+    def get_local_date(now: dt, entry: utils.RosterEntry) -> date:
+        """
+        Get the date in a guild's timezone.
+        """
+
+        return (now + timedelta(minutes=entry.offset)).date()
+
+    async def load_bong_days(self, days: Iterable[date]):
+        """
+        Load the bong titles for each of the given days that we don't have already.
+        """
+
+        days = [i for i in set(days) if not self.bong_calendar.is_loaded(i)]
+        if not days:
+            return
+        try:
+            async with self.database() as db:
+                for day in sorted(days):
+                    await self.bong_calendar.load(db, day)
+        except Exception as e:
+            self.logger.warning(f"Failed to load bong calendar for {', '.join(map(str, days))} - {e}")
+
+    @vbu.Cog.listener("on_bong_prepare")
+    async def load_bong_calendar(self, deadline: float):
+        """
+        Load the bong titles for the local days of the guilds in the upcoming bong.
+        """
+
+        when = dt.utcfromtimestamp(deadline)
+        slot = int(deadline) % 3_600
+        await self.load_bong_days([
+            self.get_local_date(when, i)
+            for i in self.bong_roster
+            if i.slot == slot
+        ])
+
+    @vbu.Cog.listener("on_bong_prepare")
+    async def warm_webhook_client(self, deadline: float):
+        """
+        Open connections to Discord right before the bong, so that the webhooks
+        don't have to wait on any handshakes.
         """
 
-        # See if it should post
+        warmed = await self.webhook_client.warm(
+            self.webhook_warm_connections,
+            headers={"User-Agent": self.bot.user_agent},
+        )
+        stats = self.webhook_client.reset_stats()
+        self.logger.info(f"Warmed {warmed} webhook connections ({stats.summary()})")
+
+    async def load_bong_roster(self):
+        """
+        Load every bong-enabled guild into the roster.
+        """
+
+        await self.bot.wait_until_ready()
+        try:
+            async with self.database() as db:
+                await self.bong_roster.load(db)
+        except Exception as e:
+            self.logger.warning(f"Failed to load bong roster - {e}")
+        self.refresh_bong_slots()
+        if self.bong_roster.loaded:
+            self.bong_rounds.close_stale(self.bong_roster.get_slot)
+
+    def update_bong_roster(self, guild_id: int, settings: dict):
+        """
+        Update a guild in the roster after its bong settings change.
+        """
+
+        self.bong_roster.update(guild_id, settings)
+        self.refresh_bong_slots()
+
+    def refresh_bong_slots(self):
+        """
+        Make sure the scheduler fires for every slot that a guild uses. The top
+        of the hour is always kept, as that's when the hourly cleanup is done.
+        """
+
+        self.bong_scheduler.set_offsets({0} | self.bong_roster.slots)
+
+    @tasks.loop(minutes=1)
+    async def fun_fact_refill(self):
+        """
+        Keep the fun fact pool topped up through the hour.
+        """
+
+        # Keep the API off the network around the top of the hour
         now = dt.utcnow()
-        if now.hour != self.last_posted_hour and now.minute == 0:
-            self.last_posted_hour = now.hour
-        else:
+        if now.minute in (59, 0):
+            return
+        if self.fun_facts.full:
             return
-        self.bot.dispatch("bong")
+        added = await self.fun_facts.refill(self.bot.session)
+        self.logger.debug(f"Added {added} fun facts to the pool ({len(self.fun_facts)} pooled)")
+
+    @fun_fact_refill.before_loop
+    async def before_fun_fact_refill(self):
+        await self.bot.wait_until_ready()
+
+    def prepare_bong(self, deadline: float):
+        """
+        Let everything get ready for the upcoming bong.
+        """
+
+        self.bot.dispatch("bong_prepare", deadline)
+
+    def bing_bong(self, deadline: float, drift: float):
+        """
+        Do the bong.
+        """
+
+        self.logger.info(f"Bong deadline reached with {drift * 1_000:.2f}ms drift")
+        self.bot.dispatch("bong", None, int(deadline) % 3_600)
+
+    def compile_bong_payload(self, fun_fact: str) -> utils.PayloadTemplate:
+        """
+        Build and serialise the parts of the bong webhook payload that are the same
+        for every guild in a round, leaving gaps for the title, colour, avatar and button.
+        """
+
+        # Make an embed that contains a fun fact :) (by catdotjs)
+        embed = discord.Embed(
+            description=f"__**fun fact:**__ {fun_fact}",
+        ).set_footer(
+            text="This bot is maintained by catdotjs#6969. If bot stops working, please let them know.",
+            icon_url="https://static.vecteezy.com/system/resources/previews/017/172/383/original/warning-message-concept-represented-by-exclamation-mark-icon-exclamation-symbol-in-circle-png.png"
+        ).to_dict()
+        embed['title'] = utils.PayloadTemplate.field("title")
+        embed['color'] = utils.PayloadTemplate.field("colour")
+        return utils.PayloadTemplate(
+            {
+                "username": self.bot.user.name,
+                "avatar_url": utils.PayloadTemplate.field("avatar_url"),
+                "embeds": [embed],
+                "components": utils.PayloadTemplate.field("components"),
+            },
+            optional=("components",),
+        )
+
+    @staticmethod
+    def get_bong_components(emoji: str) -> list:
+        """
+        Build the bong button with the given emoji.
+        """
+
+        return discord.ui.MessageComponents(
+            discord.ui.ActionRow(
+                discord.ui.Button(
+                    custom_id="BONG MESSAGE BUTTON",
+                    emoji=emoji,
+                    style=discord.ButtonStyle.secondary,
+                )
+            )
+        ).to_dict()
 
     async def send_guild_bong_message(
             self,
+            payload: utils.PayloadTemplate,
+            headers: Dict[str, str],
             text: str,
             now: dt,
-            guild_id: int,
-            settings: dict,
-            guilds_to_delete: set):
+            entry: utils.RosterEntry,
+            guilds_to_delete: set,
+            failures: dict) -> Optional[utils.DispatchOutcome]:
         """
         An async function to send a bong message to the given guild.
 
         Parameters
         ----------
+        payload : utils.PayloadTemplate
+            This round's precompiled webhook payload.
+        headers : Dict[str, str]
+            The headers to send with the webhook.
         text : str
-            The text to send.
+            The text to send, including any override for the guild.
         now : datetime.datetime
             The current time.
-        guild_id : int
-            The ID of the guild to send the settings for.
-        settings : dict
-            The guild's settings.
+        entry : utils.RosterEntry
+            The guild's bong channel, webhook and emoji.
         guilds_to_delete : set
-            A set of guilds to delete. Not handled by this function, but outside of it.
-            Can be added to.
+            A set of guilds whose webhooks should be removed. Not handled by this function,
+            but outside of it. Added to when the guild's webhook has already tripped the circuit breaker.
+        failures : dict
+            A dict of guild ID to the status and body of its failed send. These are recorded
+            against the circuit breaker outside of this function, once the whole round is done.
+
+        Returns
+        -------
+        Optional[utils.DispatchOutcome]
+            What happened to the send, or ``None`` if the guild's webhook is dead.
         """
 
-        avatar_url = f"https://raw.githubusercontent.com/Voxel-Fox-Ltd/BigBen/master/config/images/{now.hour % 12}.png"
+        guild_id = entry.guild_id
+        channel_id = entry.channel_id
+        avatar_hour = (now + timedelta(minutes=entry.offset)).hour % 12
 
         # Try for the guild
         try:
 
-            # Lets set our channel ID here
-            channel_id = settings['bong_channel_id']
-            if channel_id is None:
-                return
-
-            # Can we hope we have a webhook?
-            payload = {}
-            if not settings.get("bong_channel_webhook"):
-                return  # Death to channel sends
-
             # Grab webook
-            webhook_url = settings.get("bong_channel_webhook")
-            if not webhook_url:
-                return
-            url = webhook_url + "?wait=1"
-            payload.update({
-                "username": self.bot.user.name,
-                "avatar_url": avatar_url,
-            })
-
-            # Set up our emoji to be added
-            emoji = settings['bong_emoji']
-
-            # See if we should get some other text - Make an embed that contains a fun fact :) (by catdotjs)
-            site = await self.bot.session.get("https://uselessfacts.jsph.pl/random.json?language=en")
-            fun_fact = await site.json()
-            override_text = settings.get('override_text', {}).get(f"{now.month}-{now.day}")
-            payload['embeds'] = discord.ui.MessageComponents(
-                    discord.Embed(
-                        title=(override_text or text),
-                        colour=discord.Colour(random.randint(8388608,16777214)),
-                        description=f"__**fun fact:**__ {fun_fact['text']}",
-                    ).set_footer(
-                        text="This bot is maintained by catdotjs#6969. If bot stops working, please let them know.",
-                        icon_url="https://static.vecteezy.com/system/resources/previews/017/172/383/original/warning-message-concept-represented-by-exclamation-mark-icon-exclamation-symbol-in-circle-png.png"
-                        )
-                ).to_dict()
-
-            # Set up the components to be added
-            if emoji:
-                payload['components'] = discord.ui.MessageComponents(
-                    discord.ui.ActionRow(
-                        discord.ui.Button(
-                            custom_id="BONG MESSAGE BUTTON",
-                            emoji=emoji,
-                            style=discord.ButtonStyle.secondary,
-                        )
-                    )
-                ).to_dict()
-
-            # Generate headers
-            headers = {
-                "User-Agent": self.bot.user_agent,
-                "Authorization": f"Bot {self.bot.config['token']}",
-            }
+            if self.webhook_health.is_tripped(guild_id):
+                guilds_to_delete.add(guild_id)
+                return None  # It's dead, don't keep trying it
+            url = entry.webhook_url + "?wait=1"
+
+            # Fill in this guild's parts of the payload - each distinct value is only encoded once a round
+            emoji = entry.emoji
+            body = payload.render(
+                title=payload.get_encoded(("title", text), lambda: text),
+                colour=str(random.randint(8388608, 16777214)).encode(),
+                avatar_url=payload.get_encoded(
+                    ("avatar_url", avatar_hour),
+                    lambda: f"https://raw.githubusercontent.com/Voxel-Fox-Ltd/BigBen/master/config/images/{avatar_hour}.png",
+                ),
+                components=payload.get_encoded(("components", emoji), lambda: self.get_bong_components(emoji)) if emoji else None,
+            )
 
             # Send message
-            site: aiohttp.ClientResponse = await self.bot.session.post(url, json=payload, headers=headers)
-            if site.ok:
-                message_payload = await site.json()
-                # elif site.status in [400, 401, 403, 404]:
-            else:
-                message_payload = await site.text()
-                self.logger.info(f"Send failed - {site.status} (G{guild_id}/C{channel_id}) - {message_payload}")
-                return
+            response = await self.webhook_dispatcher.send(self.webhook_client.session, url, data=body, headers=headers)
+            if not response.ok:
+                self.logger.info(
+                    f"Send failed after {response.attempts} attempts - {response.status} "
+                    f"(G{guild_id}/C{channel_id}) - {response.data}"
+                )
+                failures[guild_id] = (response.status, response.data,)
+                return response.outcome
+            self.webhook_health.record_success(guild_id)
+            message_payload = response.data
 
             # Cache message
-            self.current_bong_messages.add(int(message_payload['id']))
+            message_id = int(message_payload['id'])
+            self.bong_rounds.open(message_id, guild_id)
+            if self.bong_round_journal is not None:
+                self.bong_round_journal.record_open(message_id, guild_id)
             self.logger.info(f"Sent bong message to channel (G{guild_id}/C{channel_id}/M{message_payload['id']})")
+            return response.outcome
 
         except Exception as e:
             self.logger.info(f"Failed sending message to guild (G{guild_id}) - {e}", exc_info=e)
+            return utils.DispatchOutcome.DROPPED
 
     @vbu.Cog.listener("on_bong")
-    async def do_bong(self, bong_guild_id: Optional[int] = None):
+    async def do_bong(self, bong_guild_id: Optional[int] = None, slot: Optional[int] = None):
         """
         Dispatch the bong message.
+
+        Parameters
+        ----------
+        bong_guild_id : Optional[int]
+            A single guild to send a test bong to.
+        slot : Optional[int]
+            The firing slot (in seconds past the hour) to send to the guilds of.
+            If neither this nor the guild is given then every guild is sent to.
         """
 
-        # Get text
-        now = dt.utcnow()
-        text = self.BONG_TEXT.get(
-            (now.day, now.month, now.year),
-            self.BONG_TEXT.get(
-                (now.day, now.month),
-                self.DEFAULT_BONG_TEXT
-            )
-        ).format(now)
-        self.logger.info(f"Sending bong message text '{text}'")
+        # Get a fun fact - this comes from the prefetched pool so it doesn't wait on the API
+        fun_fact = self.fun_facts.get()
+
+        # Build everything that's the same for every guild up front
+        payload = self.compile_bong_payload(fun_fact)
+        headers = {
+            "User-Agent": self.bot.user_agent,
+            "Authorization": f"Bot {self.bot.config['token']}",
+            "Content-Type": "application/json",
+        }
+
+        # Work out which guilds are in this slot
+        if not self.bong_roster.loaded:
+            await self.load_bong_roster()
+        slot_guild_ids = None
+        if bong_guild_id is None and slot is not None:
+            slot_guild_ids = {i.guild_id for i in self.bong_roster if i.slot == slot}
 
         # Clear caches
         guilds_to_delete = set()
+        failures: Dict[int, Tuple[Optional[int], Any]] = {}
+        already_sent = set()
         if bong_guild_id is None:
-            self.current_bong_messages.clear()  # Clear for the reacted to bong first role
+            self.logger.info(f"Last round click-to-claim latency: {self.claim_latency.summary()}")
+            self.logger.info(f"Last round click-to-response latency: {self.response_latency.summary()}")
+            self.claim_latency.reset()
+            self.response_latency.reset()
+
+            # Close these guilds' last rounds, but keep any from this slot that we sent
+            # before a restart - those guilds don't need sending to again
+            slot_start = round((time.time() - (slot or 0)) / 3_600) * 3_600 + (slot or 0)
+            already_sent = self.bong_rounds.guilds_since(slot_start)
+            self.bong_rounds.close_all(before=slot_start, guild_ids=slot_guild_ids)  # Clear for the reacted to bong first role
+            evicted = self.bong_rounds.evict()
+            self.logger.info(
+                f"Evicted {evicted} old bong rounds - {len(self.bong_rounds)} rounds "
+                f"with {self.bong_rounds.click_count} clicks remaining"
+            )
+            if self.bong_round_journal is not None:
+                self.bong_round_journal.compact(self.bong_rounds)
+            if already_sent:
+                self.logger.info(f"Not resending to {len(already_sent)} guilds that already got this hour's bong")
 
         # Set up what we need to wait for
         tasks_to_gather = []
 
-        # Let's see our cached guilds
-        for guild_id, settings in self.bot.guild_settings.copy().items():
+        # Let's see our bong-enabled guilds
+        if slot_guild_ids is not None:
+            entries = [i for i in self.bong_roster if i.guild_id in slot_guild_ids]
+        elif bong_guild_id is None:
+            entries = list(self.bong_roster)
+        else:
+            entry = self.bong_roster.get(bong_guild_id)
+            entries = [entry] if entry else []
 
-            # See if we give a shit about this guild
-            if bong_guild_id is not None and bong_guild_id != guild_id:
-                continue
+        # Get the titles for each guild's local day - these should have been loaded
+        # before the bong, but load them now if that didn't happen
+        now = dt.utcnow()
+        await self.load_bong_days(self.get_local_date(now, i) for i in entries)
+        self.logger.info(f"Sending bong message text '{self.bong_calendar.get_title(now.date())}'")
+        for entry in entries:
 
             # Only allow whitelisted guilds
-            if guild_id not in self.ALLOWED_GUILD_IDS:
+            if self.allowed_guild_ids and entry.guild_id not in self.allowed_guild_ids:
+                continue
+
+            # Only send to the guilds that this worker is responsible for
+            if bong_guild_id is None and not self.partitioner.owns(entry.guild_id):
                 continue
 
-            # See if they have a webhook
-            if settings.get("bong_channel_webhook"):
-                tasks_to_gather.append(self.send_guild_bong_message(
-                    text, now, guild_id, settings, guilds_to_delete,
-                ))
+            # And that haven't already been sent to
+            if entry.guild_id in already_sent:
+                continue
+
+            # Send to them
+            tasks_to_gather.append(self.send_guild_bong_message(
+                payload, headers, self.bong_calendar.get_title(self.get_local_date(now, entry), entry.guild_id),
+                now, entry, guilds_to_delete, failures,
+            ))
 
         # Gather all of our data, send all the messages, etc
-        await asyncio.gather(*tasks_to_gather)
+        fanout_start = time.perf_counter()
+        outcomes = collections.Counter(await asyncio.gather(*tasks_to_gather))
+        if bong_guild_id is None:
+            REGISTRY.observe("bigben_bong_fanout_seconds", time.perf_counter() - fanout_start)
+            self.webhook_connections = self.webhook_client.reset_stats()
+            self.logger.info(f"Webhook connections this round: {self.webhook_connections.summary()}")
 
         # Sick we're done
-        self.logger.info("Done sending bong messages")
+        self.logger.info(
+            f"Done sending bong messages - "
+            f"{outcomes[utils.DispatchOutcome.FIRST_TRY]} sent first try, "
+            f"{outcomes[utils.DispatchOutcome.RETRIED]} retried, "
+            f"{outcomes[utils.DispatchOutcome.DROPPED]} dropped"
+        )
+
+        # Count the failures against each guild's webhook, unless most of the round failed the
+        # same way - that's Discord having problems, not that many webhooks being deleted
+        if self.webhook_health.is_outage(len(tasks_to_gather), (i[0] for i in failures.values())):
+            REGISTRY.inc("bigben_webhook_outages_total")
+            self.logger.warning(
+                f"{len(failures)} of {len(tasks_to_gather)} bong sends failed - "
+                f"not counting them against any webhooks"
+            )
+        else:
+            for guild_id, (status, data) in failures.items():
+                if self.webhook_health.record_failure(guild_id, status, data):
+                    self.logger.info(f"Disabling bong webhook after repeated failures (G{guild_id})")
+                    guilds_to_delete.add(guild_id)
+
+        # Clear out any dead webhooks
+        if guilds_to_delete:
+            await self.remove_dead_webhooks(guilds_to_delete)
+
+    async def remove_dead_webhooks(self, guild_ids: set):
+        """
+        Remove the bong webhook from every given guild in one go, and tell them
+        to run setup again.
+
+        Parameters
+        ----------
+        guild_ids : set
+            The IDs of the guilds whose webhooks are dead.
+        """
+
+        # Remove them from the database
+        try:
+            async with self.database() as db:
+                await db(
+                    """UPDATE guild_settings SET bong_channel_webhook=NULL WHERE guild_id=ANY($1::BIGINT[])""",
+                    list(guild_ids),
+                )
+        except Exception as e:
+            self.logger.warning(f"Failed to remove {len(guild_ids)} dead bong webhooks - {e}")
+            return
+        REGISTRY.inc("bigben_webhooks_disabled_total", len(guild_ids))
+        self.logger.info(f"Removed {len(guild_ids)} dead bong webhooks")
+
+        # Remove them from the cache
+        channel_ids = []
+        for guild_id in guild_ids:
+            settings = self.bot.guild_settings.get(guild_id)
+            if settings is None:
+                self.bong_roster.remove(guild_id)
+                continue
+            settings['bong_channel_webhook'] = None
+            self.bong_roster.remove(guild_id)
+            self.webhook_health.reset(guild_id)
+            if settings.get('bong_channel_id'):
+                channel_ids.append(settings['bong_channel_id'])
+
+        # Tell the admins
+        self.refresh_bong_slots()
+        await asyncio.gather(*[self.send_dead_webhook_message(i) for i in channel_ids])
+
+    async def send_dead_webhook_message(self, channel_id: int):
+        """
+        Tell a bong channel that its webhook is gone.
+        """
+
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            return
+        try:
+            await channel.send(
+                "I can't send bong messages here any more - the webhook I was using has been deleted "
+                "or I've lost access to it. Please ask a server admin to run `/setup` again to set the bong channel."
+            )
+        except discord.HTTPException:
+            self.logger.info(f"Couldn't tell channel about its dead bong webhook (C{channel_id})")
+
+    def add_bong_click(self, payload: discord.Interaction):
+        """
+        Add the user's click to the bong round. This needs to happen before anything
+        is awaited, so that the podium is in the order that the clicks came in.
+
+        Parameters
+        ----------
+        payload : discord.Interaction
+            An interaction on the bong message.
+        """
+
+        try:
+            assert payload.message
+            assert payload.user
+        except AssertionError:
+            return
+        bong_round = self.bong_rounds.get_or_create(payload.message.id)
+        on_podium = len(bong_round.podium) < 3
+        if bong_round.add_click(payload.user.id, str(payload.user)):  # Add this user to a list of clickers
+            if self.bong_round_journal is not None:
+                self.bong_round_journal.record_click(payload.message.id, payload.user.id, str(payload.user) if on_podium else None)
+
+    def update_bong_message_components(self, payload: discord.Interaction):
+        """
+        Schedule an edit to the bong message to show the new click count. Edits
+        are coalesced so that a click storm doesn't edit the message once per click.
+
+        Parameters
+        ----------
+        payload : discord.Interaction
+            An interaction on the bong message, used to make the edit.
+        """
+
+        try:
+            assert payload.message
+            assert payload.message.components
+        except AssertionError:
+            return
+        self.bong_message_editor.schedule(
+            payload.message.id,
+            lambda: self.edit_bong_message_components(payload),
+        )
 
-    async def update_bong_message_components(self, payload: discord.Interaction):
+    async def edit_bong_message_components(self, payload: discord.Interaction):
         """
-        Update the components on a message to show the user click count.
+        Edit the components on a message to show the user click count.
 
         Parameters
         ----------
         payload : discord.Interaction
-            A (not responded to) interaction that lets us update the bong message.
+            An already-acknowledged interaction on the bong message.
         """
 
         # Get the current components
@@ -248,38 +684,38 @@ class BongHandler(vbu.Cog):
             assert payload.message.components
         except AssertionError:
             return
-        components = payload.message.components
+        bong_round = self.bong_rounds.get(payload.message.id)
+        if bong_round is None:
+            return
+        bong_button = payload.message.components.get_component("BONG MESSAGE BUTTON")
+        if bong_button is None:
+            return
 
         colours = [discord.ButtonStyle.primary, discord.ButtonStyle.success, discord.ButtonStyle.danger]
         medals = ["\N{FIRST PLACE MEDAL}","\N{SECOND PLACE MEDAL}","\N{THIRD PLACE MEDAL}"]
-        amount_of_components = len(components.components[0].components)
-
-        # Add the "first clicked by" button
-        if amount_of_components <= 3 and payload.user.id not in self.bong_button_clicks[payload.message.id]:
-            username = str(payload.user)
-            components.components[0].add_component(
-                discord.ui.Button(
-                    label=f"{username}",
-                    custom_id=f"BONG MESSAGE CLICKED {amount_of_components}",
-                    emoji=medals[amount_of_components-1],
-                    disabled=True,
-                    style=colours[amount_of_components-1],
-                )
-            )
-
-        self.bong_button_clicks[payload.message.id].add(payload.user.id)  # Add this user to a list of clickers
 
         # Update the bong button
-        bong_button = components.get_component("BONG MESSAGE BUTTON")
-        button_clicks = len(self.bong_button_clicks[payload.message.id])
+        button_clicks = bong_round.click_count
         if button_clicks > 1:
             bong_button.label = f"{button_clicks} clicks"
         else:
             bong_button.label = f"{button_clicks} click"
+        action_row = discord.ui.ActionRow(bong_button)
+
+        # Add the "first clicked by" buttons
+        for index, username in enumerate(bong_round.podium):
+            action_row.add_component(
+                discord.ui.Button(
+                    label=f"{username}",
+                    custom_id=f"BONG MESSAGE CLICKED {index + 1}",
+                    emoji=medals[index],
+                    disabled=True,
+                    style=colours[index],
+                )
+            )
 
         # Edit the message using the payload
-        await payload.response.edit_message(components=components)
-        # self.logger.info(f"Tried to update components on message {payload.message.id} - {r.status}")
+        await payload.edit_original_message(components=discord.ui.MessageComponents(action_row))
         self.logger.info(f"Tried to update components on message {payload.message.id}")
 
     @vbu.Cog.listener()
@@ -289,6 +725,7 @@ class BongHandler(vbu.Cog):
         """
 
         # See if it's a bong button
+        received_at = time.perf_counter()
         if payload.custom_id != "BONG MESSAGE BUTTON":
             return
         try:
@@ -297,67 +734,62 @@ class BongHandler(vbu.Cog):
         except AssertionError:
             return
 
-        # Get the current times as something we can compare
-        message_timestamp = payload.message.created_at
-        message_time_serial = (
-            message_timestamp.year,
-            message_timestamp.month,
-            message_timestamp.day,
-            message_timestamp.hour,
-        )
-        now = dt.utcnow()
-        now_serial = (
-            now.year,
-            now.month,
-            now.day,
-            now.hour,
-        )
+        # Get the current times as something we can compare - which hour of the
+        # guild's bong slot the message was sent in, and which we're in now
+        slot = self.bong_roster.get_slot(payload.guild_id)
+        message_period = (payload.message.created_at.timestamp() - slot) // 3_600
+        now_period = (time.time() - slot) // 3_600
 
         # Check that the times are the same, so that the user can get good
-        if message_time_serial != now_serial:
+        if message_period != now_period:
 
             # If the button is cached then we'll handle it
-            if payload.message.id in self.bong_button_clicks and payload.message.id in self.first_button_click:
-                await self.update_bong_message_components(payload)
+            bong_round = self.bong_rounds.get(payload.message.id)
+            if bong_round is not None and bong_round.first_clicker is not None:
+                self.add_bong_click(payload)
+                await payload.response.defer_update()
+                self.update_bong_message_components(payload)
                 await payload.followup.send("You can't click a bong button from the past :<", ephemeral=True)
             else:
                 await payload.response.send_message("You can't click a bong button from the past :<", ephemeral=True)
             return
 
         # Say that the user has clicked the button
-        self.first_button_click.setdefault(payload.message.id, str(payload.user))  # Say this button was clicked first by user
-
-        # Grab a lock so we can edit the message
-        lock = self.bong_handle_locks[payload.message.id]
-
-        # Try and get the lock
-        response_text: str = ""
-        try:
-            if lock.locked():
-                raise asyncio.TimeoutError()
-            await asyncio.wait_for(lock.acquire(), timeout=0.5)
-
-        # Can't get the lock, tell them they weren't first
-        except asyncio.TimeoutError:
+        bong_round = self.bong_rounds.get_or_create(payload.message.id)
+        if bong_round.first_clicker is None:
+            bong_round.first_clicker = str(payload.user)  # Say this button was clicked first by user
+
+        # Claim the round and record the winner and the click - there's no await
+        # until all of that's done, so only one person can ever win, and the winner
+        # is recorded even if responding to the interaction fails
+        won = bong_round.claim(payload.user.id)
+        if won:
+            if self.bong_round_journal is not None:
+                self.bong_round_journal.record_claim(payload.message.id, payload.user.id, bong_round.claimed_at)
+            self.handle_bong_component(payload)
+        if bong_round.winner_id is not None:
+            self.claim_latency.observe(time.perf_counter() - received_at)
+            REGISTRY.observe("bigben_click_claim_seconds", time.perf_counter() - received_at)
+        self.add_bong_click(payload)
+
+        # Work out what to tell them
+        if won:
+            response_text = "You were the first to react! :D"
+        elif bong_round.winner_id is not None:
             response_text = "You weren't the first person to click the button :c"
-
-        # We got the lock! Let's go gamer
         else:
+            response_text = "This button has already been clicked :<"
 
-            # See if it's in our list of unreacted-to messages
-            if payload.message.id not in self.current_bong_messages:
-                response_text = "This button has already been clicked :<"
-            else:
-                response_text = "You were the first to react! :D"
-                await self.handle_bong_component(payload)
-            lock.release()
+        # Acknowledge the click straight away - the message itself is edited later
+        await payload.response.defer_update()
+        self.response_latency.observe(time.perf_counter() - received_at)
+        REGISTRY.observe("bigben_click_response_seconds", time.perf_counter() - received_at)
 
         # And update the bong message
-        await self.update_bong_message_components(payload)
-        if response_text:
-            await payload.followup.send(response_text, ephemeral=True)
+        self.update_bong_message_components(payload)
+        await payload.followup.send(response_text, ephemeral=True)
 
-    async def handle_bong_component(self, payload: discord.Interaction):
+    def handle_bong_component(self, payload: discord.Interaction):
         """
         Handle a bong button being pressed for the first time
         """
@@ -369,20 +801,17 @@ class BongHandler(vbu.Cog):
             return
 
         # Database handle
-        self.logger.info(f"Guild {payload.guild_id} with user {payload.user.id} in {discord.utils.utcnow() - discord.Object(payload.message.id).created_at}")
-        self.current_bong_messages.discard(payload.message.id)  # We don't need to handle this one any more
-        async with self.bot.database() as db:
-            await db(
-                """SELECT * FROM bong_log WHERE guild_id=$1 ORDER BY timestamp DESC LIMIT 1""",
-                payload.guild_id,
-            )
-            await db(
-                """INSERT INTO bong_log (guild_id, user_id, timestamp, message_timestamp) VALUES ($1, $2, $3, $4)""",
-                payload.guild_id,
-                payload.user.id,
-                discord.utils.naive_dt(discord.utils.utcnow()),
-                discord.utils.naive_dt(discord.Object(payload.message.id).created_at),
-            )
+        bong_round = self.bong_rounds.get_or_create(payload.message.id)
+        claimed_at = dt.utcfromtimestamp(bong_round.claimed_at or time.time())
+        message_timestamp = discord.utils.naive_dt(discord.Object(payload.message.id).created_at)
+        self.logger.info(f"Guild {payload.guild_id} with user {payload.user.id} in {claimed_at - message_timestamp}")
+        self.bong_log_writer.add(
+            payload.guild_id,
+            payload.user.id,
+            claimed_at,
+            message_timestamp,
+            payload.message.id,
+        )  # Written to the database in bulk by the flush loop
 
         # Don't manage roles for now
         return
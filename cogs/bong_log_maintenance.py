@@ -0,0 +1,173 @@
+import re
+import typing
+from datetime import datetime as dt, date, timedelta
+
+from discord.ext import tasks, vbu
+
+from cogs import utils
+
+
+class BongLogMaintenance(vbu.Cog):
+    """
+    Keeps the bong log split into monthly partitions, and rolls up old months
+    into ``bong_log_rollups`` so that the raw rows don't have to be kept forever.
+    """
+
+    PARTITION_NAME = "bong_log_y{0.year:04d}m{0.month:02d}"
+    PARTITION_REGEX = re.compile(r"bong_log_y(?P<year>\d{4})m(?P<month>\d{2})")
+    ROLLUP_LOCK_ID = 0x626f6e67  # An arbitrary key for the advisory lock, so only one worker rolls up at a time
+
+    ROLLUP_QUERY = """
+        INSERT INTO bong_log_rollups (guild_id, user_id, month, count, total_reaction_time, reaction_times)
+        SELECT
+            guild_id, user_id, $1::DATE, COUNT(*), SUM(timestamp - message_timestamp),
+            ARRAY_AGG(EXTRACT(EPOCH FROM timestamp - message_timestamp)::DOUBLE PRECISION)
+        FROM bong_log
+        WHERE timestamp >= $1 AND timestamp < $2
+        GROUP BY guild_id, user_id
+        ON CONFLICT (guild_id, user_id, month) DO UPDATE SET
+            count=bong_log_rollups.count + excluded.count,
+            total_reaction_time=bong_log_rollups.total_reaction_time + excluded.total_reaction_time,
+            reaction_times=bong_log_rollups.reaction_times || excluded.reaction_times
+    """
+
+    def __init__(self, bot: vbu.Bot):
+        super().__init__(bot)
+        bong_config = self.bot.config.get("bong", {})
+        rollup_days = bong_config.get("bong_log_rollup_days", 180)
+        self.rollup_after = timedelta(days=max(rollup_days, 31)) if rollup_days else None
+        # How old a month has to be before it's rolled up - always longer than the bongcount periods,
+        # so that they can be answered from the raw rows alone
+
+        self.drop_raw = bong_config.get("bong_log_drop_raw", False)
+        # Whether to drop rolled up partitions rather than keeping them detached
+
+        self.maintain_bong_log.change_interval(hours=bong_config.get("bong_log_maintenance_hours", 6.0))
+        self.maintain_bong_log.start()
+
+    def cog_unload(self):
+        self.maintain_bong_log.cancel()
+
+    def database(self):
+        return utils.timed_database(self.bot.database)
+
+    @staticmethod
+    def add_months(month: date, months: int) -> date:
+        """
+        Get the first day of the month a given number of months after the given one.
+        """
+
+        index = (month.year * 12) + (month.month - 1) + months
+        return date(index // 12, (index % 12) + 1, 1)
+
+    @tasks.loop(hours=6)
+    async def maintain_bong_log(self):
+        """
+        Run the bong log maintenance, logging rather than raising any errors
+        so that the loop keeps going and tries again next time.
+        """
+
+        try:
+            await self.run_maintenance()
+        except Exception as e:
+            self.logger.error(f"Failed to maintain the bong log - {e}", exc_info=e)
+
+    @maintain_bong_log.before_loop
+    async def before_maintain_bong_log(self):
+        await self.bot.wait_until_ready()
+
+    async def run_maintenance(self) -> None:
+        """
+        Make sure the upcoming partitions exist, and roll up any old ones.
+        """
+
+        this_month = dt.utcnow().date().replace(day=1)
+        for month in (this_month, self.add_months(this_month, 1),):
+            await self.create_partition(month)
+        if self.rollup_after is None:
+            return
+        cutoff = (dt.utcnow() - self.rollup_after).date()
+        for month in await self.get_logged_months():
+            if self.add_months(month, 1) > cutoff:
+                break
+            await self.roll_up_month(month)
+
+    async def create_partition(self, month: date) -> None:
+        """
+        Create the bong log partition for a given month, if it doesn't exist already.
+        """
+
+        name = self.PARTITION_NAME.format(month)
+        try:
+            async with self.database() as db:
+                await db(
+                    f"""CREATE TABLE IF NOT EXISTS {name} PARTITION OF bong_log
+                    FOR VALUES FROM ('{month.isoformat()}') TO ('{self.add_months(month, 1).isoformat()}')"""
+                )
+        except Exception as e:
+            # Most likely the default partition already has rows for this month,
+            # which are still counted - they'll just be rolled up from there instead
+            self.logger.error(f"Failed to create bong log partition {name} - {e}")
+
+    async def get_logged_months(self) -> typing.List[date]:
+        """
+        Get every month that has rows in the bong log, oldest first.
+        """
+
+        async with self.database() as db:
+            partitions = await db(
+                """SELECT child.relname AS name FROM pg_inherits
+                JOIN pg_class child ON child.oid=pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent='bong_log'::REGCLASS""",
+            )
+            earliest = await db("SELECT MIN(timestamp) AS timestamp FROM bong_log_default")
+        months = set()
+        for row in partitions:
+            match = self.PARTITION_REGEX.fullmatch(row['name'])
+            if match:
+                months.add(date(int(match.group("year")), int(match.group("month")), 1))
+        if earliest and earliest[0]['timestamp']:
+            months.add(earliest[0]['timestamp'].date().replace(day=1))
+        return sorted(months)
+
+    async def roll_up_month(self, month: date) -> bool:
+        """
+        Roll up a month of the bong log into ``bong_log_rollups``, then take its
+        rows out of the bong log. This is done in a single transaction, so each
+        row is counted either raw or rolled up, never both.
+
+        Returns
+        -------
+        bool
+            Whether the month was rolled up - this is ``False`` if another
+            worker was already rolling up.
+        """
+
+        name = self.PARTITION_NAME.format(month)
+        start = dt.combine(month, dt.min.time())
+        end = dt.combine(self.add_months(month, 1), dt.min.time())
+        async with self.database() as db:
+            await db("BEGIN")
+            try:
+                locked = await db("SELECT pg_try_advisory_xact_lock($1) AS locked", self.ROLLUP_LOCK_ID)
+                if not locked[0]['locked']:
+                    await db("ROLLBACK")
+                    return False
+                await db(self.ROLLUP_QUERY, start, end)
+                partition = await db("SELECT TO_REGCLASS($1) IS NOT NULL AS exists", name)
+                if partition[0]['exists']:
+                    await db(f"ALTER TABLE bong_log DETACH PARTITION {name}")
+                    if self.drop_raw:
+                        await db(f"DROP TABLE {name}")
+                await db("DELETE FROM bong_log WHERE timestamp >= $1 AND timestamp < $2", start, end)
+                await db("COMMIT")
+            except Exception:
+                await db("ROLLBACK")
+                raise
+        self.logger.info(f"Rolled up bong log for {month:%Y-%m}" + (" and dropped its partition" if self.drop_raw else ""))
+        return True
+
+
+def setup(bot: vbu.Bot):
+    x = BongLogMaintenance(bot)
+    bot.add_cog(x)
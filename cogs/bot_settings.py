@@ -1,5 +1,38 @@
+import re
+
 import discord
-from discord.ext import vbu
+from discord.ext import commands, vbu
+
+
+class UtcOffsetConverter(commands.Converter):
+    """
+    Converts a UTC offset like "+05:30", "-3:30" or "10" into a number of minutes.
+    """
+
+    OFFSET_REGEX = re.compile(r"(?:UTC|GMT)?\s*(?P<sign>[+-])?(?P<hours>\d{1,2})(?::?(?P<minutes>\d{2}))?", re.IGNORECASE)
+
+    async def convert(self, ctx, argument: str) -> int:
+        match = self.OFFSET_REGEX.fullmatch(argument.strip())
+        if match is None:
+            raise commands.BadArgument("That isn't a valid UTC offset - try something like `+05:30` or `-8`.")
+        minutes = int(match.group("hours")) * 60 + int(match.group("minutes") or 0)
+        if match.group("sign") == "-":
+            minutes = -minutes
+        if not -12 * 60 <= minutes <= 14 * 60:
+            raise commands.BadArgument("UTC offsets have to be between -12:00 and +14:00.")
+        return minutes
+
+
+def format_utc_offset(minutes) -> str:
+    minutes = minutes or 0
+    return f"UTC{'-' if minutes < 0 else '+'}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
+
+
+def update_bong_roster(ctx):
+    bong_handler = ctx.bot.get_cog("BongHandler")
+    if bong_handler is None:
+        return
+    bong_handler.update_bong_roster(ctx.interaction.guild_id, ctx.bot.guild_settings[ctx.interaction.guild_id])
 
 
 async def bong_channel_storage_whatever(ctx, data):
@@ -7,11 +40,11 @@ async def bong_channel_storage_whatever(ctx, data):
     await vbu.menus.Menu.callbacks.set_table_column(vbu.menus.DataLocation.GUILD, "guild_settings", "bong_channel_id")(ctx, (channel,))
     ctx.bot.guild_settings[ctx.interaction.guild_id]["bong_channel_id"] = channel.id if channel is not None else channel
     if channel is None:
-        return
+        return update_bong_roster(ctx)
     try:
         webhook = await channel.create_webhook(name="Big Ben")
     except discord.HTTPException:
-        return
+        return update_bong_roster(ctx)
     async with ctx.bot.database() as db:
         await db(
             """INSERT INTO guild_settings (guild_id, bong_channel_webhook)
@@ -19,6 +52,20 @@ async def bong_channel_storage_whatever(ctx, data):
             ctx.interaction.guild_id, webhook.url,
         )
     ctx.bot.guild_settings[ctx.interaction.guild_id]["bong_channel_webhook"] = webhook.url
+    bong_handler = ctx.bot.get_cog("BongHandler")
+    if bong_handler is not None:
+        bong_handler.webhook_health.reset(ctx.interaction.guild_id)
+    update_bong_roster(ctx)
+
+
+async def bong_emoji_cache_whatever(ctx, data):
+    await vbu.menus.Menu.callbacks.set_cache_from_key(vbu.menus.DataLocation.GUILD, "bong_emoji")(ctx, data)
+    update_bong_roster(ctx)
+
+
+async def bong_offset_cache_whatever(ctx, data):
+    await vbu.menus.Menu.callbacks.set_cache_from_key(vbu.menus.DataLocation.GUILD, "bong_offset")(ctx, data)
+    update_bong_roster(ctx)
 
 
 settings_menu = vbu.menus.Menu(
@@ -56,7 +103,19 @@ settings_menu = vbu.menus.Menu(
             ),
         ],
         callback=vbu.menus.Menu.callbacks.set_table_column(vbu.menus.DataLocation.GUILD, "guild_settings", "bong_emoji"),
-        cache_callback=vbu.menus.Menu.callbacks.set_cache_from_key(vbu.menus.DataLocation.GUILD, "bong_emoji"),
+        cache_callback=bong_emoji_cache_whatever,
+    ),
+    vbu.menus.Option(
+        display=lambda ctx: f"Set bong timezone (currently {format_utc_offset(ctx.bot.guild_settings[ctx.interaction.guild_id].get('bong_offset'))})",
+        component_display="Set bong timezone",
+        converters=[
+            vbu.menus.Converter(
+                prompt="What's your server's UTC offset (eg `+05:30`)? Bongs will be sent on the hour in that timezone.",
+                converter=UtcOffsetConverter,
+            ),
+        ],
+        callback=vbu.menus.Menu.callbacks.set_table_column(vbu.menus.DataLocation.GUILD, "guild_settings", "bong_offset"),
+        cache_callback=bong_offset_cache_whatever,
     ),
 )
 
@@ -0,0 +1,28 @@
+from discord.ext import vbu
+
+from cogs import utils
+
+
+class Metrics(vbu.Cog):
+    """
+    Serves the bot's metrics over HTTP in the Prometheus format.
+    """
+
+    def __init__(self, bot: vbu.Bot):
+        super().__init__(bot)
+        metrics_config = self.bot.config.get("metrics", {})
+        self.server = utils.MetricsServer(
+            utils.REGISTRY,
+            host=metrics_config.get("host", "127.0.0.1"),
+            port=metrics_config.get("port", 9090),
+        )
+        if metrics_config.get("enabled", False):
+            self.bot.loop.create_task(self.server.start())
+
+    def cog_unload(self):
+        self.bot.loop.create_task(self.server.stop())
+
+
+def setup(bot: vbu.Bot):
+    x = Metrics(bot)
+    bot.add_cog(x)
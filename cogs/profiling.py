@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+import typing
+from datetime import datetime as dt
+
+import discord
+from discord.ext import commands, vbu
+
+from cogs import utils
+
+
+class Profiling(vbu.Cog):
+    """
+    Watches how long the event loop is being blocked for, and profiles what's
+    blocking it - either on demand, or around every bong.
+    """
+
+    def __init__(self, bot: vbu.Bot):
+        super().__init__(bot)
+        profiling_config = self.bot.config.get("profiling", {})
+        self.loop_monitor = utils.LoopLagMonitor(interval=profiling_config.get("lag_interval", 0.1))
+        self.loop_monitor.start()
+        # Samples the event loop's scheduling delay all the time
+
+        self.sampler = utils.StackSampler(interval=profiling_config.get("sample_interval", 0.005))
+        self.output_dir = profiling_config.get("output_dir", "profiles")
+        self.profile_bongs = profiling_config.get("profile_bongs", False)
+        self.profile_after = profiling_config.get("profile_after_seconds", 10.0)
+        # Profiles the event loop's thread when asked to
+
+    def cog_unload(self):
+        self.loop_monitor.cancel()
+        self.sampler.stop()
+
+    async def profile(self, until: float, name: str) -> typing.Optional[str]:
+        """
+        Profile the event loop until the given timestamp, saving the stacks to a
+        file. Returns the path of the file, or ``None`` if a profile is already
+        running or it couldn't be saved.
+        """
+
+        if self.sampler.running:
+            return None
+        self.loop_monitor.reset()
+        self.sampler.start()
+        try:
+            await asyncio.sleep(max(until - time.time(), 0))
+        finally:
+            self.sampler.stop()
+        path = os.path.join(self.output_dir, f"{name}-{dt.utcnow():%Y%m%d-%H%M%S}.collapsed")
+        if not self.sampler.dump(path):
+            return None
+        self.logger.info(
+            f"Saved {self.sampler.sample_count} profile samples to {path} "
+            f"(event loop lag {self.loop_monitor.summary()})"
+        )
+        return path
+
+    @vbu.Cog.listener("on_bong_prepare")
+    async def profile_bong(self, deadline: float):
+        """
+        Profile from just before the bong until a little after it.
+        """
+
+        if self.profile_bongs:
+            await self.profile(deadline + self.profile_after, "bong")
+
+    @commands.command(
+        application_command_meta=commands.ApplicationCommandMeta(
+            options=[
+                discord.ApplicationCommandOption(
+                    name="seconds",
+                    description="How long to profile for.",
+                    required=False,
+                    type=discord.ApplicationCommandOptionType.number,
+                ),
+            ]
+        )
+    )
+    @commands.defer()
+    @commands.is_owner()
+    async def profileloop(self, ctx: vbu.SlashContext, seconds: typing.Optional[float] = None):
+        """
+        Profile the event loop, giving back the stacks as a flame graph input.
+        """
+
+        seconds = min(max(seconds or 10.0, 1.0), 300.0)
+        path = await self.profile(time.time() + seconds, "manual")
+        if path is None:
+            return await ctx.send("A profile is already running, or it couldn't be saved.")
+        return await ctx.send(
+            f"Took {self.sampler.sample_count:,} samples over {seconds:,.1f}s "
+            f"(event loop lag {self.loop_monitor.summary()}).",
+            file=discord.File(path),
+        )
+
+
+def setup(bot: vbu.Bot):
+    x = Profiling(bot)
+    bot.add_cog(x)
@@ -0,0 +1,19 @@
+from .bong_calendar import easter_date, BongCalendar
+from .bong_log_writer import BongLogWriter
+from .bong_round_journal import BongRoundJournal
+from .bong_rounds import BongRound, BongRoundStore
+from .bong_roster import bong_slot, RosterEntry, BongRoster
+from .charts import render_reaction_times
+from .edit_coalescer import EditCoalescer
+from .fun_facts import FunFactPool
+from .histogram import LatencyHistogram
+from .loop_monitor import LoopLagMonitor
+from .lru_cache import LRUCache
+from .metrics import MetricsRegistry, MetricsServer, REGISTRY, timed_database
+from .partitioning import BongPartitioner
+from .payload_template import PayloadTemplate
+from .scheduler import HourlyScheduler
+from .stack_sampler import StackSampler
+from .webhook_client import ConnectionStats, WebhookClient
+from .webhook_dispatcher import DispatchOutcome, WebhookResponse, WebhookDispatcher
+from .webhook_health import WebhookHealth
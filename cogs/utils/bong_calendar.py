@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import typing
+from datetime import date
+
+if typing.TYPE_CHECKING:
+    from discord.ext import vbu
+
+
+__all__ = (
+    'easter_date',
+    'BongCalendar',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+def easter_date(year: int) -> date:
+    """
+    Get the date of (Western) Easter Sunday for a given year, using the
+    anonymous Gregorian algorithm.
+    """
+
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+class BongCalendar(object):
+    """
+    Works out the bong title for each guild for a given day.
+
+    The default title for the day is worked out from the fixed dates, the
+    moveable feasts (eg Easter) and the year-specific dates. Guild overrides from
+    the ``bong_override_text`` table are bulk loaded once per day, so getting
+    a guild's title never needs the database.
+
+    Titles go by each guild's local date, so guilds either side of UTC can be
+    on different days at the same moment. The last few days that were loaded
+    are kept, and a day that isn't loaded gets its default title.
+
+    Parameters
+    ----------
+    fixed_text : Dict[Union[Tuple[int, int], Tuple[int, int, int]], str]
+        Titles keyed by ``(day, month)`` or ``(day, month, year)``. Formatted with
+        the date, so ``{0.year}`` can be used.
+    moveable_text : Dict[Callable[[int], datetime.date], str]
+        Titles keyed by a function that gets the date of the feast for a year.
+    default_text : str
+        The title to use on any other day.
+    max_days : int
+        How many loaded days to keep.
+    """
+
+    def __init__(
+            self,
+            fixed_text: typing.Dict[typing.Union[typing.Tuple[int, int], typing.Tuple[int, int, int]], str],
+            moveable_text: typing.Dict[typing.Callable[[int], date], str],
+            default_text: str,
+            max_days: int = 4):
+        self.fixed_text = fixed_text
+        self.moveable_text = moveable_text
+        self.default_text = default_text
+        self.max_days = max_days
+        self.days: typing.Dict[date, typing.Tuple[str, typing.Dict[int, str]]] = {}  # day: (title, guild overrides)
+
+    def get_default_title(self, day: date) -> str:
+        """
+        Get the title for a day, ignoring guild overrides.
+        """
+
+        text = self.fixed_text.get((day.day, day.month, day.year))
+        if text is None:
+            for get_date, moveable_text in self.moveable_text.items():
+                if get_date(day.year) == day:
+                    text = moveable_text
+                    break
+        if text is None:
+            text = self.fixed_text.get((day.day, day.month), self.default_text)
+        return text.format(day)
+
+    def is_loaded(self, day: date) -> bool:
+        return day in self.days
+
+    @property
+    def override_count(self) -> int:
+        return sum(len(overrides) for _, overrides in self.days.values())
+
+    async def load(self, db: vbu.Database, day: date) -> None:
+        """
+        Work out the titles for the given day, and load every guild's override for it.
+
+        Parameters
+        ----------
+        db : vbu.Database
+            A database connection to load the overrides with.
+        day : datetime.date
+            The day to load.
+        """
+
+        title = self.get_default_title(day)
+        rows = await db("""SELECT guild_id, text FROM bong_override_text WHERE date=$1""", day)
+        overrides = {i['guild_id']: i['text'] for i in rows if i['text']}
+        self.days[day] = (title, overrides,)
+        while len(self.days) > self.max_days:
+            del self.days[min(self.days)]
+        log.info(f"Loaded bong calendar for {day} - '{title}' with {len(overrides)} guild overrides")
+
+    def get_title(self, day: date, guild_id: typing.Optional[int] = None) -> str:
+        """
+        Get the title for a day, with the guild's override if it has one. If the
+        day isn't loaded then its default title is used.
+        """
+
+        try:
+            title, overrides = self.days[day]
+        except KeyError:
+            return self.get_default_title(day)
+        if guild_id is None:
+            return title
+        return overrides.get(guild_id, title)
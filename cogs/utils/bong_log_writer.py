@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import typing
+from datetime import datetime as dt
+
+if typing.TYPE_CHECKING:
+    from discord.ext import vbu
+
+
+__all__ = (
+    'BongLogWriter',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+BongLogRow = typing.Tuple[int, int, dt, dt, typing.Optional[int]]  # (guild ID, user ID, timestamp, message timestamp, message ID)
+
+
+class BongLogWriter(object):
+    """
+    Buffers bong winners in memory and writes them to the database in bulk,
+    so that handling a click never has to wait on the database.
+
+    Each flush is a single statement that inserts every buffered row into
+    ``bong_log`` and updates ``bong_counts`` and ``bong_user_counts`` to match, along with how many users
+    have each count in ``bong_count_histogram`` and ``bong_user_count_histogram``. If a flush fails the
+    rows are put back into the buffer to be tried again next time.
+
+    Parameters
+    ----------
+    max_buffer : int
+        The most rows to hold on to if the database is down. Past this the
+        oldest rows are dropped.
+    """
+
+    FLUSH_QUERY = """
+        WITH inserted AS (
+            INSERT INTO bong_log (guild_id, user_id, timestamp, message_timestamp)
+            SELECT * FROM UNNEST($1::BIGINT[], $2::BIGINT[], $3::TIMESTAMP[], $4::TIMESTAMP[])
+            RETURNING guild_id, user_id, timestamp - message_timestamp AS reaction_time
+        ), guild_added AS (
+            SELECT guild_id, user_id, COUNT(*) AS added, SUM(reaction_time) AS reaction_time
+            FROM inserted GROUP BY guild_id, user_id
+        ), guild_counts AS (
+            INSERT INTO bong_counts (guild_id, user_id, count, total_reaction_time)
+            SELECT guild_id, user_id, added, reaction_time FROM guild_added
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                count=bong_counts.count + excluded.count,
+                total_reaction_time=bong_counts.total_reaction_time + excluded.total_reaction_time
+            RETURNING guild_id, user_id, count
+        ), guild_histogram AS (
+            INSERT INTO bong_count_histogram (guild_id, count, users)
+            SELECT guild_id, moved.count, SUM(moved.users)
+            FROM guild_counts JOIN guild_added USING (guild_id, user_id)
+            CROSS JOIN LATERAL (VALUES (guild_counts.count, 1), (guild_counts.count - guild_added.added, -1)) moved (count, users)
+            WHERE moved.count > 0
+            GROUP BY guild_id, moved.count ORDER BY guild_id, moved.count
+            ON CONFLICT (guild_id, count) DO UPDATE SET users=bong_count_histogram.users + excluded.users
+        ), user_added AS (
+            SELECT user_id, COUNT(*) AS added FROM inserted GROUP BY user_id
+        ), user_counts AS (
+            INSERT INTO bong_user_counts (user_id, count)
+            SELECT user_id, added FROM user_added
+            ON CONFLICT (user_id) DO UPDATE SET count=bong_user_counts.count + excluded.count
+            RETURNING user_id, count
+        )
+        INSERT INTO bong_user_count_histogram (count, users)
+        SELECT moved.count, SUM(moved.users)
+        FROM user_counts JOIN user_added USING (user_id)
+        CROSS JOIN LATERAL (VALUES (user_counts.count, 1), (user_counts.count - user_added.added, -1)) moved (count, users)
+        WHERE moved.count > 0
+        GROUP BY moved.count ORDER BY moved.count
+        ON CONFLICT (count) DO UPDATE SET users=bong_user_count_histogram.users + excluded.users
+    """  # Each user moves from their old count to their new one in the histograms
+
+    def __init__(self, max_buffer: int = 100_000):
+        self.max_buffer = max_buffer
+        self.buffer: typing.List[BongLogRow] = []
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def add(
+            self,
+            guild_id: int,
+            user_id: int,
+            timestamp: dt,
+            message_timestamp: dt,
+            message_id: typing.Optional[int] = None) -> None:
+        """
+        Queue a bong winner to be written on the next flush.
+
+        Parameters
+        ----------
+        guild_id : int
+            The guild that the bong was in.
+        user_id : int
+            The user who clicked first.
+        timestamp : datetime.datetime
+            When they clicked, as a naive UTC datetime.
+        message_timestamp : datetime.datetime
+            When the bong message was sent, as a naive UTC datetime.
+        message_id : Optional[int]
+            The bong message, so that the caller can tell which rounds were written.
+            Isn't written to the database.
+        """
+
+        self.buffer.append((guild_id, user_id, timestamp, message_timestamp, message_id,))
+
+    async def flush(self, database: typing.Callable[[], vbu.Database]) -> typing.List[BongLogRow]:
+        """
+        Write everything in the buffer to the database.
+
+        Parameters
+        ----------
+        database : Callable[[], vbu.Database]
+            A function returning a database connection context manager,
+            eg ``bot.database``.
+
+        Returns
+        -------
+        List[Tuple[int, int, datetime.datetime, datetime.datetime, Optional[int]]]
+            The ``(guild_id, user_id, timestamp, message_timestamp, message_id)`` rows that were written.
+        """
+
+        async with self.lock:
+            if not self.buffer:
+                return []
+            rows, self.buffer = self.buffer, []
+            try:
+                async with database() as db:
+                    await db(self.FLUSH_QUERY, *[list(i) for i in zip(*rows)][:4])
+            except Exception as e:
+                log.error(f"Failed to write {len(rows)} bong log rows - {e}", exc_info=e)
+                self.buffer = (rows + self.buffer)[-self.max_buffer:]
+                return []
+        log.info(f"Wrote {len(rows)} bong log rows")
+        return rows
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import typing
+
+if typing.TYPE_CHECKING:
+    from discord.ext import vbu
+
+
+__all__ = (
+    'bong_slot',
+    'RosterEntry',
+    'BongRoster',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+def bong_slot(offset: typing.Optional[int]) -> int:
+    """
+    Get the firing slot (in seconds past the UTC hour) for a guild's UTC
+    offset (in minutes), so that its bong lands on the local hour.
+    """
+
+    return (-(offset or 0) % 60) * 60
+
+
+class RosterEntry(object):
+    """
+    Everything needed to send a bong to a single guild.
+
+    Attributes
+    ----------
+    offset : int
+        The guild's UTC offset, in minutes.
+    slot : int
+        When the guild's bong is sent, in seconds past the UTC hour.
+    """
+
+    __slots__ = ('guild_id', 'channel_id', 'webhook_url', 'emoji', 'offset', 'slot',)
+
+    def __init__(
+            self,
+            guild_id: int,
+            channel_id: int,
+            webhook_url: str,
+            emoji: typing.Optional[str],
+            offset: typing.Optional[int] = None):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.webhook_url = webhook_url
+        self.emoji = emoji
+        self.offset = offset or 0
+        self.slot = bong_slot(offset)
+
+
+class BongRoster(object):
+    """
+    The guilds that have a bong channel and webhook set up, and nothing else.
+
+    The roster is loaded once with :meth:`load`, then kept up to date with
+    :meth:`update` whenever a guild changes its bong settings.
+    """
+
+    def __init__(self):
+        self.entries: typing.Dict[int, RosterEntry] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> typing.Iterator[RosterEntry]:
+        return iter(self.entries.values())
+
+    def get(self, guild_id: int) -> typing.Optional[RosterEntry]:
+        return self.entries.get(guild_id)
+
+    @property
+    def slots(self) -> typing.Set[int]:
+        """
+        Every firing slot that a guild in the roster uses.
+        """
+
+        return {i.slot for i in self.entries.values()}
+
+    def get_slot(self, guild_id: typing.Optional[int]) -> int:
+        entry = self.entries.get(guild_id) if guild_id else None
+        return entry.slot if entry else 0
+
+    async def load(self, db: vbu.Database) -> None:
+        """
+        Load every bong-enabled guild from the database, replacing what's cached.
+        """
+
+        rows = await db(
+            """SELECT guild_id, bong_channel_id, bong_channel_webhook, bong_emoji, bong_offset FROM guild_settings
+            WHERE bong_channel_id IS NOT NULL AND bong_channel_webhook IS NOT NULL""",
+        )
+        self.entries = {
+            i['guild_id']: RosterEntry(
+                i['guild_id'], i['bong_channel_id'], i['bong_channel_webhook'], i['bong_emoji'], i['bong_offset'],
+            )
+            for i in rows
+        }
+        self.loaded = True
+        log.info(f"Loaded {len(self.entries)} guilds into the bong roster")
+
+    def update(self, guild_id: int, settings: dict) -> None:
+        """
+        Update a guild's entry from its settings, adding or removing it as needed.
+
+        Parameters
+        ----------
+        guild_id : int
+            The guild that changed.
+        settings : dict
+            The guild's cached settings.
+        """
+
+        channel_id = settings.get('bong_channel_id')
+        webhook_url = settings.get('bong_channel_webhook')
+        if not channel_id or not webhook_url:
+            self.entries.pop(guild_id, None)
+            return
+        self.entries[guild_id] = RosterEntry(
+            guild_id, channel_id, webhook_url, settings.get('bong_emoji'), settings.get('bong_offset'),
+        )
+
+    def remove(self, guild_id: int) -> None:
+        self.entries.pop(guild_id, None)
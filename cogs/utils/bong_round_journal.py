@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import typing
+
+if typing.TYPE_CHECKING:
+    from .bong_rounds import BongRoundStore
+
+
+__all__ = (
+    'BongRoundJournal',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+JournalRecord = typing.Tuple[int, int, int, typing.Optional[str]]  # (kind, message ID, value, name)
+
+
+class BongRoundJournal(object):
+    """
+    An append-only file of changes to the bong rounds, so that a restart
+    partway through an hour can pick up where it left off.
+
+    Each record is a kind, a message ID, a value (a guild or user ID) and an
+    optional name, packed into a few bytes. Records are flushed to the OS as
+    they're written, so they survive the process dying, and the whole file is
+    read back in one go by :meth:`restore`. The file is rewritten to only hold
+    the live rounds by :meth:`compact`.
+
+    Claims are marked as flushed once their winner is in the database, so that
+    a winner who was still waiting in the bong log buffer when the process died
+    can be written again after a restart.
+
+    Parameters
+    ----------
+    path : str
+        The file to keep the journal in.
+    """
+
+    OPEN = 1  # value: guild ID
+    CLOSED = 2  # value: guild ID
+    CLAIM = 3  # value: winner's user ID
+    CLICK = 4  # value: user ID, name: their name if they're on the podium
+    PODIUM = 5  # name: a podium name, for compacted rounds
+    CLAIMED_AT = 6  # value: when the round was claimed, in microseconds since the epoch
+    FLUSHED = 7  # the winner has been written to the database
+
+    HEADER = struct.Struct("<BQQH")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file: typing.Optional[typing.BinaryIO] = None
+
+    def _pack(self, records: typing.Iterable[JournalRecord]) -> bytes:
+        data = bytearray()
+        for kind, message_id, value, name in records:
+            encoded = name.encode()[:0xFFFF] if name else b""
+            data += self.HEADER.pack(kind, message_id, value, len(encoded))
+            data += encoded
+        return bytes(data)
+
+    def _write(self, records: typing.Iterable[JournalRecord]) -> None:
+        try:
+            if self.file is None:
+                self.file = open(self.path, "ab")
+            self.file.write(self._pack(records))
+            self.file.flush()
+        except OSError as e:
+            log.error(f"Failed to write to bong round journal {self.path} - {e}")
+
+    def record_open(self, message_id: int, guild_id: int) -> None:
+        self._write([(self.OPEN, message_id, guild_id, None)])
+
+    def record_claim(self, message_id: int, user_id: int, claimed_at: float) -> None:
+        self._write([
+            (self.CLAIM, message_id, user_id, None),
+            (self.CLAIMED_AT, message_id, int(claimed_at * 1_000_000), None),
+        ])
+
+    def record_flushed(self, message_ids: typing.Iterable[int]) -> None:
+        self._write([(self.FLUSHED, i, 0, None) for i in message_ids])
+
+    def record_click(self, message_id: int, user_id: int, username: typing.Optional[str] = None) -> None:
+        self._write([(self.CLICK, message_id, user_id, username)])
+
+    def restore(self, store: BongRoundStore) -> int:
+        """
+        Replay the journal into a round store.
+
+        Returns
+        -------
+        int
+            The number of records that were replayed.
+        """
+
+        try:
+            with open(self.path, "rb") as a:
+                data = a.read()
+        except FileNotFoundError:
+            return 0
+        offset = 0
+        replayed = 0
+        header_size = self.HEADER.size
+        while offset + header_size <= len(data):
+            kind, message_id, value, name_length = self.HEADER.unpack_from(data, offset)
+            offset += header_size
+            if offset + name_length > len(data):
+                break  # A record cut off partway through being written
+            name = data[offset:offset + name_length].decode(errors="replace") if name_length else None
+            offset += name_length
+            round = store.get_or_create(message_id)
+            if kind in (self.OPEN, self.CLOSED):
+                round.open = kind == self.OPEN
+                round.guild_id = value or None
+            elif kind == self.CLAIM:
+                round.open = False
+                round.winner_id = value
+            elif kind == self.CLICK:
+                round.add_click(value, name)
+                if round.first_clicker is None:
+                    round.first_clicker = name or ""
+            elif kind == self.PODIUM and name is not None:
+                round.podium.append(name)
+            elif kind == self.CLAIMED_AT:
+                round.claimed_at = value / 1_000_000
+            elif kind == self.FLUSHED:
+                round.flushed = True
+            replayed += 1
+        log.info(f"Replayed {replayed} records from bong round journal {self.path}")
+        return replayed
+
+    def compact(self, store: BongRoundStore) -> None:
+        """
+        Rewrite the journal to hold only the rounds currently in the store.
+        """
+
+        records = []
+        for round in store.rounds.values():
+            records.append((self.OPEN if round.open else self.CLOSED, round.message_id, round.guild_id or 0, None))
+            if round.winner_id is not None:
+                records.append((self.CLAIM, round.message_id, round.winner_id, None))
+            if round.claimed_at is not None:
+                records.append((self.CLAIMED_AT, round.message_id, int(round.claimed_at * 1_000_000), None))
+            if round.flushed:
+                records.append((self.FLUSHED, round.message_id, 0, None))
+            records.extend((self.PODIUM, round.message_id, 0, i) for i in round.podium)
+            records.extend((self.CLICK, round.message_id, i, None) for i in round.clicks)
+        self.close()
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "wb") as a:
+                a.write(self._pack(records))
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            log.error(f"Failed to compact bong round journal {self.path} - {e}")
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import array
+import bisect
+import time
+import typing
+
+
+__all__ = (
+    'BongRound',
+    'BongRoundStore',
+)
+
+
+DISCORD_EPOCH = 1_420_070_400_000
+
+
+def snowflake_time(snowflake: int) -> float:
+    """
+    Get the unix timestamp that a Discord snowflake was created at.
+    """
+
+    return ((snowflake >> 22) + DISCORD_EPOCH) / 1_000
+
+
+class BongRound(object):
+    """
+    The state of a single bong message.
+
+    Attributes
+    ----------
+    message_id : int
+        The ID of the bong message.
+    guild_id : Optional[int]
+        The guild the message was sent to, if it was sent by this process.
+    open : bool
+        Whether the message was sent by this process and is still waiting
+        for someone to click it first.
+    winner_id : Optional[int]
+        The ID of the user who claimed the round.
+    claimed_at : Optional[float]
+        The unix timestamp that the round was claimed at.
+    flushed : bool
+        Whether the winner has been written to the database.
+    first_clicker : Optional[str]
+        The name of the first user to click the button.
+    clicks : array.array
+        The sorted IDs of every user who has clicked the button.
+    podium : List[str]
+        The names of the first three users to click the button, in order.
+    """
+
+    __slots__ = (
+        'message_id', 'guild_id', 'open', 'winner_id', 'claimed_at', 'flushed',
+        'first_clicker', 'clicks', 'podium',
+    )
+
+    def __init__(self, message_id: int, open: bool = False, guild_id: typing.Optional[int] = None):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.open = open
+        self.winner_id: typing.Optional[int] = None
+        self.claimed_at: typing.Optional[float] = None
+        self.flushed = False
+        self.first_clicker: typing.Optional[str] = None
+        self.clicks = array.array('Q')
+        self.podium: typing.List[str] = []
+
+    def claim(self, user_id: int) -> bool:
+        """
+        Try to claim the round for a user. This doesn't await, so the first
+        caller to get here is always the only one that gets ``True``.
+        """
+
+        if not self.open:
+            return False
+        self.open = False
+        self.winner_id = user_id
+        self.claimed_at = time.time()
+        return True
+
+    @property
+    def created_at(self) -> float:
+        return snowflake_time(self.message_id)
+
+    @property
+    def click_count(self) -> int:
+        return len(self.clicks)
+
+    def has_clicked(self, user_id: int) -> bool:
+        index = bisect.bisect_left(self.clicks, user_id)
+        return index < len(self.clicks) and self.clicks[index] == user_id
+
+    def add_click(self, user_id: int, username: typing.Optional[str] = None) -> bool:
+        """
+        Add a user to the clickers, and to the podium if there's space.
+        Returns whether they're new.
+        """
+
+        index = bisect.bisect_left(self.clicks, user_id)
+        if index < len(self.clicks) and self.clicks[index] == user_id:
+            return False
+        self.clicks.insert(index, user_id)
+        if username is not None and len(self.podium) < 3:
+            self.podium.append(username)
+        return True
+
+
+class BongRoundStore(object):
+    """
+    Holds the state of recent bong messages, keyed by message ID, and drops
+    rounds once their message is older than ``max_age`` seconds.
+
+    Parameters
+    ----------
+    max_age : float
+        How old (in seconds) a bong message can be before its state is evicted.
+    """
+
+    def __init__(self, max_age: float = 7_200):
+        self.max_age = max_age
+        self.rounds: typing.Dict[int, BongRound] = {}
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self.rounds
+
+    @property
+    def click_count(self) -> int:
+        """
+        The total number of clicks held over every round.
+        """
+
+        return sum(len(i.clicks) for i in self.rounds.values())
+
+    @property
+    def open_count(self) -> int:
+        """
+        The number of rounds still waiting on a first click.
+        """
+
+        return sum(1 for i in self.rounds.values() if i.open)
+
+    def get(self, message_id: int) -> typing.Optional[BongRound]:
+        return self.rounds.get(message_id)
+
+    def get_or_create(self, message_id: int) -> BongRound:
+        """
+        Get the state for a message, creating a closed round if we don't have one.
+        """
+
+        try:
+            return self.rounds[message_id]
+        except KeyError:
+            round = self.rounds[message_id] = BongRound(message_id)
+            return round
+
+    def open(self, message_id: int, guild_id: typing.Optional[int] = None) -> BongRound:
+        """
+        Add a newly sent bong message that's waiting for its first click.
+        """
+
+        round = self.get_or_create(message_id)
+        round.open = True
+        if guild_id is not None:
+            round.guild_id = guild_id
+        return round
+
+    def close_all(
+            self,
+            before: typing.Optional[float] = None,
+            guild_ids: typing.Optional[typing.Container[int]] = None) -> None:
+        """
+        Stop every round from being claimed, or only those whose message was
+        sent before the given unix timestamp and/or to one of the given guilds.
+        """
+
+        for i in self.rounds.values():
+            if before is not None and i.created_at >= before:
+                continue
+            if guild_ids is not None and i.guild_id not in guild_ids:
+                continue
+            i.open = False
+
+    def close_stale(
+            self,
+            get_slot: typing.Callable[[typing.Optional[int]], int],
+            now: typing.Optional[float] = None,
+            interval: int = 3_600) -> None:
+        """
+        Close every round whose message was sent before the start of its guild's
+        current bong period, given a function to get each guild's firing slot.
+        """
+
+        now = now or time.time()
+        for i in self.rounds.values():
+            slot = get_slot(i.guild_id)
+            if i.created_at < (now - slot) // interval * interval + slot:
+                i.open = False
+
+    def unflushed(self) -> typing.List[BongRound]:
+        """
+        Get the claimed rounds whose winner hasn't been written to the database.
+        """
+
+        return [
+            i for i in self.rounds.values()
+            if i.winner_id is not None and i.claimed_at is not None and i.guild_id is not None and not i.flushed
+        ]
+
+    def guilds_since(self, since: float) -> typing.Set[int]:
+        """
+        Get the guilds that this process has sent a bong message to since the
+        given unix timestamp.
+        """
+
+        return {i.guild_id for i in self.rounds.values() if i.guild_id is not None and i.created_at >= since}
+
+    def evict(self, now: typing.Optional[float] = None) -> int:
+        """
+        Drop every round whose message is older than ``max_age``.
+
+        Returns
+        -------
+        int
+            The number of rounds that were dropped.
+        """
+
+        cutoff = (now or time.time()) - self.max_age
+        expired = [i for i, r in self.rounds.items() if r.created_at < cutoff]
+        for i in expired:
+            del self.rounds[i]
+        return len(expired)
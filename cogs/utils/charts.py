@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import io
+import typing
+
+if typing.TYPE_CHECKING:
+    from array import array
+
+
+__all__ = (
+    'render_reaction_times',
+)
+
+
+def render_reaction_times(reaction_times: array) -> bytes:
+    """
+    Draw a histogram of a user's bong reaction times as a PNG.
+
+    This is CPU bound and slow enough to hold up the bot, so it's meant to be
+    run in a process pool rather than on the event loop. Matplotlib is only
+    imported here so that it's only ever loaded into the pool's processes.
+
+    Parameters
+    ----------
+    reaction_times : array.array
+        The reaction times, in seconds.
+
+    Returns
+    -------
+    bytes
+        The rendered PNG.
+    """
+
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    # Leave out the slowest 1% so a single late click doesn't squash the chart
+    values = sorted(reaction_times)
+    upper = values[int((len(values) - 1) * 0.99)] or 1.0
+    median = values[len(values) // 2]
+
+    # Build our output graph
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    ax.hist(values, bins=min(max(int(len(values) ** 0.5), 10), 50), range=(0, upper), color="lightblue", edgecolor="steelblue")
+    ax.axvline(median, color="darkorange", linestyle="--", label=f"Median {median:,.2f}s")
+    ax.set_xlabel("Reaction time (seconds)")
+    ax.set_ylabel("Bongs")
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+    # And save it into memory
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
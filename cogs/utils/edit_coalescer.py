@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import typing
+
+
+__all__ = (
+    'EditCoalescer',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+EditCallback = typing.Callable[[], typing.Awaitable[typing.Any]]
+
+
+class EditCoalescer(object):
+    """
+    Collapses bursts of edits to the same thing into at most one edit every
+    ``interval`` seconds.
+
+    The first edit for a key is run straight away. Each later call to
+    :meth:`schedule` replaces any edit still waiting for the same key, so only
+    the newest one is run once the interval is up. An edit scheduled while
+    another is running is always run afterwards, so the last state is never lost.
+
+    Parameters
+    ----------
+    interval : float
+        The minimum time (in seconds) between edits for the same key.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.pending: typing.Dict[typing.Hashable, EditCallback] = {}
+        self.tasks: typing.Dict[typing.Hashable, asyncio.Task] = {}
+        self.scheduled_count = 0
+        self.edit_count = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def schedule(self, key: typing.Hashable, callback: EditCallback) -> None:
+        """
+        Schedule an edit, replacing any that's still waiting for the same key.
+
+        Parameters
+        ----------
+        key : Hashable
+            What's being edited, eg a message ID.
+        callback : Callable[[], Awaitable[Any]]
+            A function that does the edit when called.
+        """
+
+        self.scheduled_count += 1
+        self.pending[key] = callback
+        if key not in self.tasks:
+            self.tasks[key] = asyncio.get_event_loop().create_task(self._run(key))
+
+    async def _run(self, key: typing.Hashable) -> None:
+        try:
+            while key in self.pending:
+                callback = self.pending.pop(key)
+                self.edit_count += 1
+                try:
+                    await callback()
+                except Exception as e:
+                    log.info(f"Failed running coalesced edit for {key} - {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            self.tasks.pop(key, None)
+
+    def cancel(self) -> None:
+        for i in list(self.tasks.values()):
+            i.cancel()
+        self.pending.clear()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import collections
+import logging
+import pathlib
+import random
+import time
+import typing
+
+import aiohttp
+
+from .metrics import REGISTRY
+
+
+__all__ = (
+    'FunFactPool',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+class FunFactPool(object):
+    """
+    A bounded pool of prefetched fun facts, so that sending a bong never has
+    to wait on the fun fact API.
+
+    Facts are fetched in the background with :meth:`refill`, and handed out
+    synchronously with :meth:`get`. If the pool is empty (the API was slow or
+    down) then a fact from the local fallback file is used instead.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the fun fact API.
+    size : int
+        The maximum number of facts to keep in the pool.
+    timeout : float
+        How long to wait for the API before giving up on a fetch.
+    fallback_file : str
+        A text file of facts, one per line, to use when the pool is empty.
+    """
+
+    DEFAULT_URL = "https://uselessfacts.jsph.pl/random.json?language=en"
+    DEFAULT_FALLBACK_FILE = "config/fun_facts.txt"
+
+    def __init__(
+            self,
+            url: str = DEFAULT_URL,
+            size: int = 5,
+            timeout: float = 5.0,
+            fallback_file: str = DEFAULT_FALLBACK_FILE):
+        self.url = url
+        self.timeout = timeout
+        self.pool: typing.Deque[str] = collections.deque(maxlen=size)
+        self.fallback_facts: typing.List[str] = self._load_fallback(fallback_file)
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    @staticmethod
+    def _load_fallback(filename: str) -> typing.List[str]:
+        try:
+            text = pathlib.Path(filename).read_text(encoding="utf-8")
+        except OSError as e:
+            log.warning(f"Couldn't load fallback fun facts from {filename} - {e}")
+            return []
+        return [i.strip() for i in text.splitlines() if i.strip() and not i.startswith("#")]
+
+    @property
+    def full(self) -> bool:
+        return len(self.pool) >= typing.cast(int, self.pool.maxlen)
+
+    async def fetch(self, session: aiohttp.ClientSession) -> typing.Optional[str]:
+        """
+        Get a single fact from the API, returning ``None`` if that failed.
+        """
+
+        start = time.perf_counter()
+        try:
+            async with session.get(self.url, timeout=aiohttp.ClientTimeout(total=self.timeout)) as site:
+                if not site.ok:
+                    log.info(f"Fun fact fetch failed - {site.status}")
+                    return None
+                data = await site.json()
+        except Exception as e:
+            log.info(f"Fun fact fetch failed - {e}")
+            return None
+        finally:
+            REGISTRY.observe("bigben_fun_fact_fetch_seconds", time.perf_counter() - start)
+        text = data.get("text")
+        if not text:
+            return None
+        return text.strip()
+
+    async def refill(self, session: aiohttp.ClientSession, limit: typing.Optional[int] = None) -> int:
+        """
+        Top up the pool from the API. Stops early if the API fails.
+
+        Parameters
+        ----------
+        session : aiohttp.ClientSession
+            The session to make the requests with.
+        limit : Optional[int]
+            The maximum number of facts to fetch in this call.
+
+        Returns
+        -------
+        int
+            How many facts were added to the pool.
+        """
+
+        added = 0
+        while not self.full and (limit is None or added < limit):
+            fact = await self.fetch(session)
+            if fact is None:
+                break
+            if fact not in self.pool:
+                self.pool.append(fact)
+            added += 1
+        return added
+
+    def get(self) -> str:
+        """
+        Get a fun fact without waiting on anything. Takes from the prefetched
+        pool if possible, otherwise falls back to a bundled fact.
+        """
+
+        if self.pool:
+            return self.pool.popleft()
+        if self.fallback_facts:
+            return random.choice(self.fallback_facts)
+        return "Big Ben is the name of the bell, not the tower."
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import array
+import bisect
+import typing
+
+
+__all__ = (
+    'LatencyHistogram',
+)
+
+
+class LatencyHistogram(object):
+    """
+    A fixed-bucket histogram of latencies, in seconds.
+
+    Parameters
+    ----------
+    buckets : Sequence[float]
+        The upper bounds of each bucket, in ascending order. Anything larger than
+        the last bound goes into an overflow bucket.
+    """
+
+    DEFAULT_BUCKETS = (
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+        0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    )
+
+    __slots__ = ('buckets', 'counts', 'count', 'total',)
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = array.array('Q', [0] * (len(self.buckets) + 1))
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def reset(self) -> None:
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimate a percentile, as the upper bound of the bucket it falls in.
+        Returns ``inf`` if it's in the overflow bucket.
+        """
+
+        if not self.count:
+            return 0.0
+        target = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no samples"
+        return (
+            f"{self.count} samples, mean {self.mean * 1_000:.1f}ms, "
+            f"p50 <={self.percentile(50) * 1_000:.0f}ms, p99 <={self.percentile(99) * 1_000:.0f}ms"
+        )
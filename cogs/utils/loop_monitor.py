@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import typing
+
+from .histogram import LatencyHistogram
+from .metrics import REGISTRY
+
+
+__all__ = (
+    'LoopLagMonitor',
+)
+
+
+class LoopLagMonitor(object):
+    """
+    Continuously measures how late the event loop runs a sleeping task, which
+    is how long anything blocking the loop is holding up every other task.
+
+    Every ``interval`` seconds the monitor sleeps and records how much longer
+    than ``interval`` it took to wake up. The lag goes into the metrics and into
+    a histogram that can be reset, so a single window (like the seconds around
+    a bong) can be looked at on its own.
+
+    Parameters
+    ----------
+    interval : float
+        How often to sample the lag, in seconds.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self.max_lag = 0.0
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def reset(self) -> None:
+        self.histogram.reset()
+        self.max_lag = 0.0
+
+    def summary(self) -> str:
+        if not self.histogram.count:
+            return "no samples"
+        return f"{self.histogram.summary()}, max {self.max_lag * 1_000:.1f}ms"
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.histogram.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            REGISTRY.observe("bigben_event_loop_lag_seconds", lag)
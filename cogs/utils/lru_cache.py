@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import collections
+import time
+import typing
+
+from .metrics import REGISTRY
+
+
+__all__ = (
+    'LRUCache',
+)
+
+
+class LRUCache(object):
+    """
+    A size-bounded cache that drops its least recently used items first.
+
+    Items can also be given an expiry time, after which they're treated as
+    missing. Hits and misses are counted, and recorded in the metrics under
+    the cache's name.
+
+    Parameters
+    ----------
+    name : str
+        What the cache is for, used to label its metrics.
+    max_size : int
+        The most items to hold.
+    ttl : Optional[float]
+        How long (in seconds) items last by default. ``None`` means they
+        last until they're invalidated or pushed out.
+    """
+
+    def __init__(self, name: str, max_size: int = 128, ttl: typing.Optional[float] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items: typing.OrderedDict[typing.Hashable, typing.Tuple[typing.Any, typing.Optional[float]]] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self.items
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """
+        Get an item, counting whether it was there.
+        """
+
+        try:
+            value, expires_at = self.items[key]
+        except KeyError:
+            value, expires_at = default, None
+            found = False
+        else:
+            found = expires_at is None or expires_at > time.time()
+            if found:
+                self.items.move_to_end(key)
+            else:
+                del self.items[key]
+                value = default
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        REGISTRY.inc("bigben_cache_requests_total", cache=self.name, result="hit" if found else "miss")
+        return value
+
+    def set(self, key: typing.Hashable, value: typing.Any, *, expires_at: typing.Optional[float] = None) -> None:
+        """
+        Add an item, pushing out the least recently used if the cache is full.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key to store the item under.
+        value : Any
+            The item.
+        expires_at : Optional[float]
+            The unix timestamp that the item expires at. Defaults to
+            ``ttl`` seconds from now.
+        """
+
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        self.items[key] = (value, expires_at,)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def pop(self, key: typing.Hashable) -> None:
+        self.items.pop(key, None)
+
+    def invalidate(self, predicate: typing.Callable[[typing.Any], bool]) -> int:
+        """
+        Drop every item whose key matches the predicate.
+
+        Returns
+        -------
+        int
+            The number of items that were dropped.
+        """
+
+        keys = [i for i in self.items if predicate(i)]
+        for i in keys:
+            del self.items[i]
+        return len(keys)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import contextlib
+import logging
+import time
+import typing
+
+from aiohttp import web
+
+from .histogram import LatencyHistogram
+
+if typing.TYPE_CHECKING:
+    from discord.ext import vbu
+
+
+__all__ = (
+    'MetricsRegistry',
+    'MetricsServer',
+    'REGISTRY',
+    'timed_database',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+LabelKey = typing.Tuple[typing.Tuple[str, str], ...]
+
+
+def format_labels(labels: LabelKey, **extra: str) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class MetricsRegistry(object):
+    """
+    A small in-process store of counters, gauges and histograms that can be
+    rendered in the Prometheus text format.
+
+    Metrics are made the first time they're used. Gauges can also be given as a
+    callback with :meth:`gauge_callback`, which is only run when the metrics
+    are rendered.
+    """
+
+    def __init__(self):
+        self.descriptions: typing.Dict[str, typing.Tuple[str, str]] = {}
+        self.counters: typing.Dict[str, typing.Dict[LabelKey, float]] = {}
+        self.gauges: typing.Dict[str, typing.Dict[LabelKey, float]] = {}
+        self.gauge_callbacks: typing.Dict[str, typing.Callable[[], float]] = {}
+        self.histograms: typing.Dict[str, typing.Dict[LabelKey, LatencyHistogram]] = {}
+        self.histogram_buckets: typing.Dict[str, typing.Sequence[float]] = {}
+
+    def describe(
+            self,
+            name: str,
+            type: str,
+            help: str,
+            buckets: typing.Optional[typing.Sequence[float]] = None) -> None:
+        """
+        Add the help text and type for a metric. Histograms can also be given
+        their buckets here.
+        """
+
+        self.descriptions[name] = (type, help,)
+        if buckets is not None:
+            self.histogram_buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1, **labels: typing.Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        metric = self.counters.setdefault(name, {})
+        metric[key] = metric.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: typing.Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        self.gauges.setdefault(name, {})[key] = value
+
+    def gauge_callback(self, name: str, callback: typing.Callable[[], float]) -> None:
+        self.gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float, **labels: typing.Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        metric = self.histograms.setdefault(name, {})
+        try:
+            histogram = metric[key]
+        except KeyError:
+            histogram = metric[key] = LatencyHistogram(
+                self.histogram_buckets.get(name, LatencyHistogram.DEFAULT_BUCKETS),
+            )
+        histogram.observe(value)
+
+    def render(self) -> str:
+        """
+        Get every metric in the Prometheus text format.
+        """
+
+        lines: typing.List[str] = []
+
+        def header(name: str, default_type: str):
+            type, help = self.descriptions.get(name, (default_type, ""))
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+
+        for name, values in self.counters.items():
+            header(name, "counter")
+            for labels, value in values.items():
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        for name, values in self.gauges.items():
+            header(name, "gauge")
+            for labels, value in values.items():
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        for name, callback in self.gauge_callbacks.items():
+            try:
+                value = callback()
+            except Exception as e:
+                log.info(f"Failed getting value for gauge {name} - {e}")
+                continue
+            header(name, "gauge")
+            lines.append(f"{name} {value}")
+        for name, histograms in self.histograms.items():
+            header(name, "histogram")
+            for labels, histogram in histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels, le=str(bound))} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe(
+    "bigben_bong_fanout_seconds", "histogram", "How long it took to send every bong message in a round.",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+REGISTRY.describe("bigben_webhook_request_seconds", "histogram", "How long each bong webhook request took.")
+REGISTRY.describe("bigben_webhook_responses_total", "counter", "The HTTP statuses returned by bong webhook requests.")
+REGISTRY.describe("bigben_webhook_sends_total", "counter", "What happened to each bong webhook send.")
+REGISTRY.describe("bigben_webhooks_disabled_total", "counter", "How many bong webhooks were removed after repeated failures.")
+REGISTRY.describe("bigben_webhook_outages_total", "counter", "Bong rounds where most sends failed the same way, so no webhooks were removed.")
+REGISTRY.describe("bigben_fun_fact_fetch_seconds", "histogram", "How long each fun fact API request took.")
+REGISTRY.describe("bigben_click_claim_seconds", "histogram", "The time from getting a bong click to deciding the winner.")
+REGISTRY.describe("bigben_click_response_seconds", "histogram", "The time from getting a bong click to acknowledging it.")
+REGISTRY.describe("bigben_db_pool_wait_seconds", "histogram", "How long it took to get a database connection.")
+REGISTRY.describe("bigben_webhook_connections_total", "counter", "Whether each bong webhook request opened a new connection or reused one.")
+REGISTRY.describe("bigben_webhook_warm_seconds", "histogram", "How long it took to warm the bong webhook connections.")
+REGISTRY.describe("bigben_event_loop_lag_seconds", "histogram", "How late the event loop was in waking a sleeping task.")
+REGISTRY.describe("bigben_cache_requests_total", "counter", "Hits and misses on each of the in-process read caches.")
+
+
+@contextlib.asynccontextmanager
+async def timed_database(database: typing.Callable[[], vbu.Database]):
+    """
+    Get a database connection, recording how long it took to get out of the pool.
+
+    Parameters
+    ----------
+    database : Callable[[], vbu.Database]
+        A function returning a database connection context manager,
+        eg ``bot.database``.
+    """
+
+    start = time.perf_counter()
+    async with database() as db:
+        REGISTRY.observe("bigben_db_pool_wait_seconds", time.perf_counter() - start)
+        yield db
+
+
+class MetricsServer(object):
+    """
+    A HTTP server that serves the metrics from a registry at ``/metrics``.
+
+    Parameters
+    ----------
+    registry : MetricsRegistry
+        The registry to serve.
+    host : str
+        The host to listen on.
+    port : int
+        The port to listen on.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9090):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.runner: typing.Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        log.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import os
+import typing
+
+if typing.TYPE_CHECKING:
+    from discord.ext import vbu
+
+
+__all__ = (
+    'BongPartitioner',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+class BongPartitioner(object):
+    """
+    Decides which guilds this process should send bongs to.
+
+    Modes
+    -----
+    ``single``
+        This process sends to every guild.
+    ``shard``
+        This process sends to the guilds on its own gateway shards, so the
+        clicks on a bong come back to the process that sent it.
+    ``static``
+        Shards are split over ``worker_count`` workers (shard ``n`` going to
+        worker ``n % worker_count``), and this process is worker number
+        ``worker_index``. The process has to be connected to exactly the shards
+        it's given, which is checked on startup.
+
+    Bong rounds are only held in memory, so the process that sends a guild's
+    bong always has to be the one connected to that guild's shard. Nothing is
+    rebalanced if a worker goes down - its guilds miss their bongs until it's
+    back.
+
+    The ``BIGBEN_WORKER_INDEX`` environment variable overrides the config, so
+    that several local processes can share one config file.
+    """
+
+    MODES = ("single", "shard", "static",)
+
+    def __init__(
+            self,
+            mode: str = "single",
+            *,
+            worker_index: int = 0,
+            worker_count: int = 1,
+            shard_ids: typing.Optional[typing.Sequence[int]] = None,
+            shard_count: typing.Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid bong partition mode {mode!r}")
+        self.mode = mode
+        self.shard_ids = set(shard_ids) if shard_ids is not None else None
+        self.shard_count = shard_count
+        self.worker_index = 0
+        self.worker_count = 1
+
+        # Make sure we're connected to the shards that we're sending for
+        if mode == "static":
+            worker_index = int(os.getenv("BIGBEN_WORKER_INDEX", worker_index))
+            if not 0 <= worker_index < worker_count:
+                raise ValueError(f"Worker index {worker_index} out of range for {worker_count} workers")
+            self.worker_index = worker_index
+            self.worker_count = worker_count
+            if worker_count > 1:
+                if self.shard_ids is None or not shard_count:
+                    raise ValueError("Static bong partitioning needs the bot's shard IDs and shard count to be set")
+                expected = {i for i in range(shard_count) if i % worker_count == worker_index}
+                if self.shard_ids != expected:
+                    raise ValueError(
+                        f"Bong worker {worker_index} of {worker_count} has to be connected to "
+                        f"shards {sorted(expected)}, not {sorted(self.shard_ids)}"
+                    )
+
+    @classmethod
+    def from_config(cls, bot: vbu.Bot, config: dict) -> BongPartitioner:
+        return cls(
+            config.get("mode", "single"),
+            worker_index=config.get("worker_index", 0),
+            worker_count=config.get("worker_count", 1),
+            shard_ids=bot.shard_ids,
+            shard_count=bot.shard_count,
+        )
+
+    @property
+    def worker_name(self) -> str:
+        """
+        A name for this process that no other worker shares, for things like
+        file names.
+        """
+
+        if self.mode == "static" and self.worker_count > 1:
+            return f"worker{self.worker_index}"
+        if self.mode != "single" and self.shard_ids:
+            return f"shard{min(self.shard_ids)}"
+        return "main"
+
+    def owns(self, guild_id: int) -> bool:
+        """
+        Whether or not this process should send the bong for the given guild.
+        """
+
+        if self.mode == "single":
+            return True
+        if self.shard_ids is None or not self.shard_count:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
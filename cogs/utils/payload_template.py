@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+import re
+import typing
+
+
+__all__ = (
+    'PayloadTemplate',
+)
+
+
+class PayloadTemplate(object):
+    """
+    A JSON payload that's serialised once, with gaps left for the fields that
+    change each time it's sent.
+
+    Mark a gap by using :meth:`field` as a value in the payload. Rendering then
+    just joins the pre-serialised pieces of the payload with the encoded value
+    for each gap, so sending the same payload many times with small changes
+    needs no JSON work past encoding those changes.
+
+    Parameters
+    ----------
+    payload : dict
+        The payload, with :meth:`field` markers for the gaps.
+    optional : Iterable[str]
+        Gaps which are top-level keys of the payload (but not the first key) that
+        are left out entirely when rendered with ``None``.
+    """
+
+    SEPARATORS = (",", ":",)
+
+    def __init__(self, payload: dict, optional: typing.Iterable[str] = ()):
+        optional = set(optional)
+        template = json.dumps(payload, separators=self.SEPARATORS)
+
+        # Find where each of the gaps are
+        markers = {}
+        for name in re.findall(r'"\\u0000(\w+)\\u0000"', template):
+            marker = json.dumps(self.field(name))
+            if name in optional:
+                marker = f',{json.dumps(name)}:{marker}'
+            markers[marker] = name
+
+        # And split the payload up around them
+        pieces = re.split("(" + "|".join(re.escape(i) for i in markers) + ")", template) if markers else [template]
+        self.literals: typing.List[bytes] = [i.encode() for i in pieces[::2]]
+        self.fields: typing.List[str] = [markers[i] for i in pieces[1::2]]
+        self.prefixes: typing.Dict[str, bytes] = {
+            name: f',{json.dumps(name)}:'.encode()
+            for name in optional
+        }
+        self.encoded: typing.Dict[typing.Hashable, bytes] = {}
+
+    @staticmethod
+    def field(name: str) -> str:
+        """
+        Get the marker for a gap in the payload.
+        """
+
+        return f"\x00{name}\x00"
+
+    def encode(self, value: typing.Any) -> bytes:
+        return json.dumps(value, separators=self.SEPARATORS).encode()
+
+    def get_encoded(self, key: typing.Hashable, factory: typing.Callable[[], typing.Any]) -> bytes:
+        """
+        Get an encoded value, only building and encoding it the first time the
+        key is seen.
+        """
+
+        try:
+            return self.encoded[key]
+        except KeyError:
+            value = self.encoded[key] = self.encode(factory())
+            return value
+
+    def render(self, **values: typing.Optional[bytes]) -> bytes:
+        """
+        Fill in the gaps with already-encoded values.
+        """
+
+        parts = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            value = values[name]
+            if name in self.prefixes:
+                if value is not None:
+                    parts.append(self.prefixes[name])
+                    parts.append(value)
+            else:
+                parts.append(value)  # type: ignore
+            parts.append(literal)
+        return b"".join(parts)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+import typing
+
+
+__all__ = (
+    'HourlyScheduler',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+class HourlyScheduler(object):
+    """
+    Fires a callback every hour, at one or more offsets (firing slots) into
+    the hour, by sleeping until the next computed deadline rather than
+    polling the clock.
+
+    Upcoming deadlines are kept in a heap, so however many slots there are
+    the scheduler only ever sleeps until the earliest one. For each deadline
+    it wakes ``lead`` seconds early to run the ``prepare`` callback, then
+    sleeps out the remainder and runs ``callback``. Sleeps are capped at
+    ``max_sleep`` seconds and re-checked against the wall clock, so clock
+    changes and suspends are noticed, and are cut short when the slots change.
+
+    If the scheduler wakes up more than ``catch_up`` seconds after a deadline
+    (because the process was busy or suspended), that deadline is skipped
+    and the slot moves on to its next one. Otherwise a late deadline is
+    fired as soon as possible. Only the most recent missed deadline for each
+    slot is ever caught up on. This includes when the scheduler is started or
+    a slot is added - a deadline up to ``catch_up`` seconds in the past is
+    fired straight away (without running ``prepare``), so a restart just
+    after the hour still sends that hour's bong. A deadline is never fired
+    twice for the same slot.
+
+    Parameters
+    ----------
+    callback : Callable[[float, float], Any]
+        Called with ``(deadline, drift)`` when a deadline is reached. The slot
+        that fired is ``deadline % interval``.
+    prepare : Optional[Callable[[float], Any]]
+        Called with ``(deadline)`` ``lead`` seconds before each deadline.
+    interval : int
+        The period of the deadlines, in seconds.
+    lead : float
+        How early to wake up to run ``prepare``.
+    catch_up : float
+        How late a deadline can be and still be fired.
+    max_sleep : float
+        The longest single sleep before checking the clock again.
+    offsets : Iterable[int]
+        The firing slots, in seconds past the start of each interval.
+    """
+
+    PREPARE = 0
+    FIRE = 1
+
+    def __init__(
+            self,
+            callback: typing.Callable[[float, float], typing.Any],
+            *,
+            prepare: typing.Optional[typing.Callable[[float], typing.Any]] = None,
+            interval: int = 3600,
+            lead: float = 2.0,
+            catch_up: float = 300.0,
+            max_sleep: float = 30.0,
+            offsets: typing.Iterable[int] = (0,)):
+        self.callback = callback
+        self.prepare = prepare
+        self.interval = interval
+        self.lead = lead
+        self.catch_up = catch_up
+        self.max_sleep = max_sleep
+        self.offsets: typing.Set[int] = set(offsets)
+        self.last_deadline: typing.Optional[float] = None
+        self.last_drift: typing.Optional[float] = None
+        self._changed = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def next_deadline(self, now: float, offset: int = 0) -> float:
+        """
+        Get the first deadline for a slot strictly after the given timestamp.
+        """
+
+        return ((now - offset) // self.interval + 1) * self.interval + offset
+
+    def set_offsets(self, offsets: typing.Iterable[int]) -> None:
+        """
+        Change the firing slots. New slots are picked up straight away, and
+        removed slots stop firing.
+        """
+
+        offsets = set(offsets)
+        if offsets != self.offsets:
+            self.offsets = offsets
+            self._changed.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def sleep_until(self, timestamp: float) -> bool:
+        """
+        Sleep until the wall clock reaches the given timestamp, or until
+        the slots change.
+
+        Returns
+        -------
+        bool
+            Whether the timestamp was reached.
+        """
+
+        while True:
+            remaining = timestamp - time.time()
+            if remaining <= 0:
+                return True
+            try:
+                await asyncio.wait_for(self._changed.wait(), min(remaining, self.max_sleep))
+                return False
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self) -> None:
+        heap: typing.List[typing.Tuple[float, int, float, int]] = []  # (wake at, PREPARE/FIRE, deadline, offset)
+        scheduled: typing.Set[int] = set()
+        fired: typing.Dict[int, float] = {}  # offset: the last deadline fired for it
+        while True:
+
+            # Add any new slots, catching up on their last deadline if it's recent enough
+            now = time.time()
+            for offset in self.offsets - scheduled:
+                deadline = self.next_deadline(now, offset)
+                missed = deadline - self.interval
+                if now - missed <= self.catch_up and fired.get(offset) != missed:
+                    heapq.heappush(heap, (missed, self.FIRE, missed, offset,))
+                else:
+                    heapq.heappush(heap, (deadline - self.lead, self.PREPARE, deadline, offset,))
+                scheduled.add(offset)
+
+            # Sleep until the next thing we need to do
+            self._changed.clear()
+            if not heap:
+                await self._changed.wait()
+                continue
+            if not await self.sleep_until(heap[0][0]):
+                continue
+            _, kind, deadline, offset = heapq.heappop(heap)
+            if offset not in self.offsets:
+                scheduled.discard(offset)
+                continue
+
+            # Wake early so that things can get ready
+            if kind == self.PREPARE:
+                if self.prepare is not None and time.time() < deadline:
+                    try:
+                        self.prepare(deadline)
+                    except Exception as e:
+                        log.error(f"Failed running bong prepare for {deadline} - {e}", exc_info=e)
+                heapq.heappush(heap, (deadline, self.FIRE, deadline, offset,))
+                continue
+
+            # And then the deadline itself
+            now = time.time()
+            deadline = max(deadline, self.next_deadline(now, offset) - self.interval)
+            drift = now - deadline
+            if drift > self.catch_up:
+                log.warning(f"Skipping deadline {deadline} - woke up {drift:.3f}s late")
+            elif fired.get(offset) != deadline:
+                fired[offset] = deadline
+                self.last_deadline = deadline
+                self.last_drift = drift
+                log.info(f"Firing deadline {deadline} with {drift * 1_000:.2f}ms drift")
+                try:
+                    self.callback(deadline, drift)
+                except Exception as e:
+                    log.error(f"Failed running bong callback for {deadline} - {e}", exc_info=e)
+
+            # Work out when this slot goes next - if we've been asleep for a while
+            # then we only care about deadlines from now on
+            deadline = self.next_deadline(max(time.time(), deadline), offset)
+            heapq.heappush(heap, (deadline - self.lead, self.PREPARE, deadline, offset,))
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import collections
+import logging
+import os
+import sys
+import threading
+import types
+import typing
+
+
+__all__ = (
+    'StackSampler',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+class StackSampler(object):
+    """
+    A sampling profiler for a single thread, meant for the event loop's.
+
+    A background thread looks at the target thread's current stack every
+    ``interval`` seconds and counts each distinct stack it sees. Because the
+    sampling happens off the event loop, a call that blocks the loop shows up
+    in the samples for as long as it blocks. The counts are written out in the
+    collapsed stack format (``frame;frame;frame count`` per line) that
+    ``flamegraph.pl``, speedscope and most other flame graph tools read.
+
+    Parameters
+    ----------
+    interval : float
+        How often to take a sample, in seconds.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: typing.Counter[str] = collections.Counter()
+        self.labels: typing.Dict[types.CodeType, str] = {}
+        self.thread_id: typing.Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.stacks.values())
+
+    def start(self, thread_id: typing.Optional[int] = None) -> None:
+        """
+        Start sampling a thread, clearing any previous samples.
+
+        Parameters
+        ----------
+        thread_id : Optional[int]
+            The thread to sample. Defaults to the thread calling this.
+        """
+
+        if self._thread is not None:
+            return
+        self.stacks.clear()
+        self.thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bigben-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> typing.Counter[str]:
+        """
+        Stop sampling, returning the count of each collapsed stack.
+        """
+
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.stacks
+
+    def _label(self, code: types.CodeType) -> str:
+        try:
+            return self.labels[code]
+        except KeyError:
+            label = self.labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            return label
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # type: ignore
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self._label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def dump(self, path: str) -> bool:
+        """
+        Write the samples to a file in the collapsed stack format.
+
+        Returns
+        -------
+        bool
+            Whether the file was written.
+        """
+
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as a:
+                for stack, count in self.stacks.most_common():
+                    a.write(f"{stack} {count}\n")
+        except OSError as e:
+            log.error(f"Failed to write profile to {path} - {e}")
+            return False
+        return True
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import typing
+
+import aiohttp
+
+from .metrics import REGISTRY
+
+
+__all__ = (
+    'ConnectionStats',
+    'WebhookClient',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionStats(object):
+    """
+    How many requests on a :class:`WebhookClient` got a new connection and how
+    many reused one that was already open.
+    """
+
+    __slots__ = ('new', 'reused', 'dns_lookups', 'dns_cache_hits',)
+
+    def __init__(self):
+        self.new = 0
+        self.reused = 0
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        total = self.new + self.reused
+        return self.reused / total if total else 0.0
+
+    def summary(self) -> str:
+        if not self.new + self.reused:
+            return "no connections"
+        return (
+            f"{self.reused} reused, {self.new} new ({self.reuse_ratio:.0%} reused), "
+            f"{self.dns_lookups} DNS lookups, {self.dns_cache_hits} DNS cache hits"
+        )
+
+
+class WebhookClient(object):
+    """
+    An HTTP session just for sending bong webhooks, so that they have their own
+    pool of kept-alive connections rather than sharing one with everything else.
+
+    Before a bong the pool can be warmed with :meth:`warm`, which looks up the
+    host and opens connections to it, so that the webhooks themselves are sent
+    over connections that have already done their DNS, TCP and TLS handshakes.
+    Whether each request got a new connection or reused one is counted in
+    :attr:`stats` until it's reset with :meth:`reset_stats`.
+
+    Parameters
+    ----------
+    limit : int
+        The most connections to have open at once.
+    keepalive : float
+        How long (in seconds) to keep an idle connection open.
+    dns_ttl : float
+        How long (in seconds) to cache DNS lookups for.
+    warm_url : str
+        A cheap URL on the webhook host to request when warming the pool.
+    timeout : float
+        How long (in seconds) a request can take if it isn't given its own
+        timeout.
+    """
+
+    def __init__(
+            self,
+            limit: int = 100,
+            keepalive: float = 60.0,
+            dns_ttl: float = 300.0,
+            warm_url: str = "https://discord.com/api/v10/gateway",
+            timeout: float = 30.0):
+        self.limit = limit
+        self.keepalive = keepalive
+        self.dns_ttl = dns_ttl
+        self.warm_url = warm_url
+        self.timeout = timeout
+        self.stats = ConnectionStats()
+        self._session: typing.Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        The client's session, made the first time it's needed so that it's made
+        inside of the running event loop.
+        """
+
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+            trace_config.on_dns_resolvehost_end.append(self._on_dns_lookup)
+            trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    keepalive_timeout=self.keepalive,
+                    ttl_dns_cache=self.dns_ttl,
+                ),
+                trace_configs=[trace_config],
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _on_connection_create(self, session, context, params) -> None:
+        self.stats.new += 1
+        REGISTRY.inc("bigben_webhook_connections_total", connection="new")
+
+    async def _on_connection_reuse(self, session, context, params) -> None:
+        self.stats.reused += 1
+        REGISTRY.inc("bigben_webhook_connections_total", connection="reused")
+
+    async def _on_dns_lookup(self, session, context, params) -> None:
+        self.stats.dns_lookups += 1
+
+    async def _on_dns_cache_hit(self, session, context, params) -> None:
+        self.stats.dns_cache_hits += 1
+
+    def reset_stats(self) -> ConnectionStats:
+        """
+        Start counting connections again, returning the counts so far.
+        """
+
+        stats, self.stats = self.stats, ConnectionStats()
+        return stats
+
+    async def _warm_one(self, headers: typing.Optional[typing.Dict[str, str]]) -> bool:
+        try:
+            async with self.session.get(self.warm_url, headers=headers) as site:
+                await site.read()
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.info(f"Failed to warm a webhook connection - {e}")
+            return False
+
+    async def warm(self, connections: int, headers: typing.Optional[typing.Dict[str, str]] = None) -> int:
+        """
+        Open connections to the webhook host and leave them in the pool.
+
+        Parameters
+        ----------
+        connections : int
+            How many connections to open. Requests are made at the same time,
+            so each one needs its own connection.
+        headers : Optional[Dict[str, str]]
+            Any headers to send with the warming requests.
+
+        Returns
+        -------
+        int
+            How many of the requests went through.
+        """
+
+        connections = min(connections, self.limit)
+        if connections <= 0:
+            return 0
+        start = time.perf_counter()
+        results = await asyncio.gather(*[self._warm_one(headers) for _ in range(connections)])
+        REGISTRY.observe("bigben_webhook_warm_seconds", time.perf_counter() - start)
+        return sum(results)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import logging
+import time
+import typing
+
+import aiohttp
+
+from .metrics import REGISTRY
+
+
+__all__ = (
+    'DispatchOutcome',
+    'WebhookResponse',
+    'WebhookDispatcher',
+)
+
+
+log = logging.getLogger(__name__)
+
+
+class DispatchOutcome(enum.Enum):
+    """
+    What happened to a single webhook send.
+    """
+
+    FIRST_TRY = "first_try"
+    RETRIED = "retried"
+    DROPPED = "dropped"
+
+
+class WebhookResponse(object):
+    """
+    The result of sending a payload through a :class:`WebhookDispatcher`.
+
+    Attributes
+    ----------
+    outcome : DispatchOutcome
+        Whether the send went through first time, after retries, or not at all.
+    status : Optional[int]
+        The HTTP status of the last attempt, or ``None`` if no request completed.
+    data : Any
+        The decoded JSON of a successful response, or the text of a failed one.
+    attempts : int
+        How many requests were made.
+    """
+
+    __slots__ = ('outcome', 'status', 'data', 'attempts',)
+
+    def __init__(self, outcome: DispatchOutcome, status: typing.Optional[int], data: typing.Any, attempts: int):
+        self.outcome = outcome
+        self.status = status
+        self.data = data
+        self.attempts = attempts
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome is not DispatchOutcome.DROPPED
+
+
+class RateLimitBucket(object):
+    """
+    The rate limit state for a single webhook, as told to us by Discord's headers.
+    """
+
+    __slots__ = ('bucket', 'remaining', 'reset_at',)
+
+    def __init__(self):
+        self.bucket: typing.Optional[str] = None
+        self.remaining: typing.Optional[int] = None
+        self.reset_at: float = 0.0
+
+    def update(self, headers: typing.Mapping[str, str]) -> None:
+        if "X-RateLimit-Bucket" in headers:
+            self.bucket = headers["X-RateLimit-Bucket"]
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Reset-After" in headers:
+            self.reset_at = time.monotonic() + float(headers["X-RateLimit-Reset-After"])
+
+    def delay(self) -> float:
+        """
+        How long we need to wait before this bucket can be used again.
+        """
+
+        if self.remaining is None or self.remaining > 0:
+            return 0.0
+        return max(self.reset_at - time.monotonic(), 0.0)
+
+
+class WebhookDispatcher(object):
+    """
+    Sends webhook payloads with a cap on how many are in flight at once,
+    respecting Discord's per-webhook and global rate limits.
+
+    Ratelimited (429) and server error (5xx) responses are retried, waiting for
+    ``Retry-After`` where it's given, as are timeouts and connection errors, until
+    ``deadline`` seconds have passed since the send was started. Each request is
+    only given until the deadline to finish. Any other failure is dropped
+    immediately.
+
+    Parameters
+    ----------
+    concurrency : int
+        The maximum number of requests in flight at once.
+    deadline : float
+        How long (in seconds) to keep retrying a send before dropping it.
+    """
+
+    def __init__(self, concurrency: int = 50, deadline: float = 30.0):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.deadline = deadline
+        self.buckets: typing.Dict[str, RateLimitBucket] = {}
+        self.global_reset_at: float = 0.0
+
+    @staticmethod
+    def get_route(url: str) -> str:
+        return url.split("?", 1)[0]
+
+    async def _wait(self, bucket: RateLimitBucket, give_up_at: float) -> bool:
+        """
+        Wait until the global and bucket limits allow a request. Returns
+        ``False`` if that would take us past the deadline.
+        """
+
+        delay = max(self.global_reset_at - time.monotonic(), bucket.delay(), 0.0)
+        if delay == 0:
+            return True
+        if time.monotonic() + delay > give_up_at:
+            return False
+        await asyncio.sleep(delay)
+        return True
+
+    async def send(
+            self,
+            session: aiohttp.ClientSession,
+            url: str,
+            *,
+            json: typing.Any = None,
+            data: typing.Optional[bytes] = None,
+            headers: typing.Optional[typing.Dict[str, str]] = None) -> WebhookResponse:
+        """
+        Post a payload to a webhook, retrying where Discord tells us to.
+
+        Parameters
+        ----------
+        session : aiohttp.ClientSession
+            The session to send the request with.
+        url : str
+            The webhook URL to post to.
+        json : Any
+            The payload to send.
+        data : Optional[bytes]
+            An already-serialised payload to send instead of ``json``.
+        headers : Optional[Dict[str, str]]
+            Any headers to send with the request.
+
+        Returns
+        -------
+        WebhookResponse
+            What happened to the send.
+        """
+
+        give_up_at = time.monotonic() + self.deadline
+        bucket = self.buckets.setdefault(self.get_route(url), RateLimitBucket())
+        attempts = 0
+        status: typing.Optional[int] = None
+        response_data: typing.Any = None
+
+        while True:
+
+            # Make sure we're allowed to send
+            if not await self._wait(bucket, give_up_at):
+                break
+
+            # Send the request
+            attempts += 1
+            retry_after: typing.Optional[float] = None
+            try:
+                async with self.semaphore:
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    start = time.perf_counter()
+                    timeout = aiohttp.ClientTimeout(total=remaining)
+                    async with session.post(url, json=json, data=data, headers=headers, timeout=timeout) as site:
+                        REGISTRY.observe("bigben_webhook_request_seconds", time.perf_counter() - start)
+                        REGISTRY.inc("bigben_webhook_responses_total", status=site.status)
+                        status = site.status
+                        bucket.update(site.headers)
+                        if site.ok:
+                            try:
+                                response_data = await site.json()
+                            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                                response_data = None  # It's been sent, so it mustn't be sent again
+                                log.warning(f"Failed to read a sent webhook's response - {e}")
+                            outcome = DispatchOutcome.FIRST_TRY if attempts == 1 else DispatchOutcome.RETRIED
+                            REGISTRY.inc("bigben_webhook_sends_total", outcome=outcome.value)
+                            return WebhookResponse(outcome, status, response_data, attempts)
+                        response_data = await site.text()
+                        if site.status == 429:
+                            retry_after = float(site.headers.get("Retry-After", 1))
+                            if site.headers.get("X-RateLimit-Global"):
+                                self.global_reset_at = time.monotonic() + retry_after
+                                log.warning(f"Hit the global ratelimit - retrying after {retry_after}s")
+                        elif site.status >= 500:
+                            retry_after = min(2 ** (attempts - 1), 8)
+            except asyncio.TimeoutError:
+                REGISTRY.inc("bigben_webhook_responses_total", status="timeout")
+                retry_after = min(2 ** (attempts - 1), 8)
+                response_data = "Timed out"
+            except aiohttp.ClientError as e:
+                REGISTRY.inc("bigben_webhook_responses_total", status="error")
+                retry_after = min(2 ** (attempts - 1), 8)
+                response_data = f"{e.__class__.__name__}: {e}"
+
+            # See if we should go again
+            if retry_after is None:
+                break
+            if time.monotonic() + retry_after > give_up_at:
+                break
+            await asyncio.sleep(retry_after)
+
+        REGISTRY.inc("bigben_webhook_sends_total", outcome=DispatchOutcome.DROPPED.value)
+        return WebhookResponse(DispatchOutcome.DROPPED, status, response_data, attempts)
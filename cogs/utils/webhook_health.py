@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import collections
+import json
+import typing
+
+
+__all__ = (
+    'WebhookHealth',
+)
+
+
+class WebhookHealth(object):
+    """
+    A circuit breaker over each guild's bong webhook.
+
+    Responses that mean the webhook is gone for good (a 404, with Discord's
+    "Unknown Webhook" error code if the body has one) are counted per guild,
+    and once a guild hits ``threshold`` of them in a row its webhook is tripped
+    and shouldn't be used again. Any successful send resets the count. Other
+    failures (ratelimits, server errors, permissions) don't count either way.
+
+    A round where most of the sends fail the same way is an outage rather than
+    that many deleted webhooks, and shouldn't be recorded at all - see
+    :meth:`is_outage`.
+
+    Parameters
+    ----------
+    threshold : int
+        How many permanent failures in a row trip the breaker.
+    outage_ratio : float
+        The share of a round's sends that have to fail with the same status
+        for it to count as an outage.
+    outage_min_sends : int
+        The fewest sends in a round for it to count as an outage, so that
+        small rounds (eg a bong to one guild) still record their failures.
+    """
+
+    PERMANENT_FAILURE_STATUS = 404
+    UNKNOWN_WEBHOOK_CODE = 10015
+
+    def __init__(self, threshold: int = 3, outage_ratio: float = 0.5, outage_min_sends: int = 10):
+        self.threshold = threshold
+        self.outage_ratio = outage_ratio
+        self.outage_min_sends = outage_min_sends
+        self.failures: typing.Dict[int, int] = {}
+        self.tripped: typing.Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.failures)
+
+    def is_tripped(self, guild_id: int) -> bool:
+        return guild_id in self.tripped
+
+    def record_success(self, guild_id: int) -> None:
+        self.failures.pop(guild_id, None)
+
+    @classmethod
+    def is_permanent_failure(cls, status: typing.Optional[int], data: typing.Any = None) -> bool:
+        """
+        Whether a failed send means that the webhook has been deleted.
+        """
+
+        if status != cls.PERMANENT_FAILURE_STATUS:
+            return False
+        try:
+            code = json.loads(data).get("code") if isinstance(data, str) else None
+        except (ValueError, AttributeError):
+            code = None
+        return code is None or code == cls.UNKNOWN_WEBHOOK_CODE
+
+    def is_outage(self, sends: int, statuses: typing.Iterable[typing.Optional[int]]) -> bool:
+        """
+        Whether a round's failures look like Discord (or our connection to it)
+        having problems rather than webhooks being deleted.
+
+        Parameters
+        ----------
+        sends : int
+            How many sends were made in the round.
+        statuses : Iterable[Optional[int]]
+            The status of each failed send in the round.
+        """
+
+        if sends < self.outage_min_sends:
+            return False
+        most_common = collections.Counter(statuses).most_common(1)
+        return bool(most_common) and most_common[0][1] > sends * self.outage_ratio
+
+    def record_failure(self, guild_id: int, status: typing.Optional[int], data: typing.Any = None) -> bool:
+        """
+        Record a failed send for a guild.
+
+        Parameters
+        ----------
+        guild_id : int
+            The guild whose webhook failed.
+        status : Optional[int]
+            The HTTP status of the failure.
+        data : Any
+            The body of the failed response.
+
+        Returns
+        -------
+        bool
+            Whether this failure tripped the breaker.
+        """
+
+        if not self.is_permanent_failure(status, data):
+            return False
+        failures = self.failures[guild_id] = self.failures.get(guild_id, 0) + 1
+        if failures < self.threshold or guild_id in self.tripped:
+            return False
+        self.tripped.add(guild_id)
+        return True
+
+    def reset(self, guild_id: int) -> None:
+        """
+        Forget everything about a guild's webhook, eg after it's been set up again.
+        """
+
+        self.failures.pop(guild_id, None)
+        self.tripped.discard(guild_id)
@@ -0,0 +1,180 @@
+"""
+Load test the bong button against bursts of clicks, without Discord or a
+database.
+
+A set of bong messages are opened in the bong handler, then every message
+gets a burst of clicks from different users spread over a short window.
+Interactions and the database are stand-ins, with configurable latency.
+The harness checks that each message got exactly one winner, and reports
+how long clicks took to be acknowledged, how busy the event loop got and
+how many message edits were made.
+
+    python scripts/bench_clicks.py --messages 100 --clicks 500 --window 200
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import discord  # noqa: E402
+
+from fakes import FakeBot, FakeInteraction, FakeMessage, FakeUser, make_snowflake  # noqa: E402
+
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+def make_components() -> discord.ui.MessageComponents:
+    return discord.ui.MessageComponents(
+        discord.ui.ActionRow(
+            discord.ui.Button(
+                custom_id="BONG MESSAGE BUTTON",
+                emoji="\N{BELL}",
+                style=discord.ButtonStyle.secondary,
+            )
+        )
+    )
+
+
+async def run_storm(args: argparse.Namespace) -> dict:
+    # Imported here so that the cog's task loops pick up the running event loop
+    from cogs.bong_handler import BongHandler
+
+    bot = FakeBot(
+        {
+            "bong": {
+                "allowed_guild_ids": [],
+                "round_journal_path": "",
+                "message_edit_interval": args.edit_interval,
+            },
+        },
+        db_latency=args.db_latency / 1_000,
+    )
+    cog = BongHandler(bot)
+    cog.bong_scheduler.cancel()
+    cog.flush_bong_log.cancel()  # The winners are flushed by hand at the end, so that they can be checked
+    cog.fun_fact_refill.cancel()  # Bongs aren't sent, so the fun facts aren't needed
+
+    # Open a bong message in each guild
+    messages = []
+    for index in range(args.messages):
+        guild_id = make_snowflake(index)
+        message = FakeMessage(make_snowflake(args.messages + index), make_components())
+        cog.bong_rounds.open(message.id, guild_id)
+        messages.append((guild_id, message,))
+
+    # Count the winners as they're recorded
+    winners = collections.Counter()
+    original_handle = cog.handle_bong_component
+
+    def counted_handle(payload):
+        winners[payload.message.id] += 1
+        return original_handle(payload)
+    cog.handle_bong_component = counted_handle
+
+    # Plan when every click lands
+    calls = collections.Counter()
+    clicks = []
+    for guild_id, message in messages:
+        for user_index in range(args.clicks):
+            user = FakeUser(make_snowflake(user_index), f"user{user_index}#0001")
+            interaction = FakeInteraction(message, user, guild_id, calls, latency=args.api_latency / 1_000)
+            clicks.append((random.uniform(0, args.window / 1_000), interaction,))
+    clicks.sort(key=lambda i: i[0])
+
+    # And fire them all
+    in_flight = 0
+    peak_in_flight = 0
+    loop_lag = []
+    ack_latency = []
+    start = 0.0
+
+    async def click(at: float, interaction: FakeInteraction):
+        nonlocal in_flight, peak_in_flight
+        await asyncio.sleep(max(start + at - time.perf_counter(), 0))
+        began = time.perf_counter()
+        loop_lag.append(began - (start + at))
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        try:
+            await cog.on_component_interaction(interaction)
+        finally:
+            in_flight -= 1
+        if interaction.acknowledged_at is not None:
+            ack_latency.append(interaction.acknowledged_at - (start + at))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[click(at, interaction) for at, interaction in clicks])
+    duration = time.perf_counter() - start
+
+    # Let the last edits go out, and write the winners
+    while len(cog.bong_message_editor):
+        await asyncio.sleep(args.edit_interval / 2)
+    written = await cog.bong_log_writer.flush(bot.database)
+
+    # Check that every message has exactly one winner
+    written_guilds = collections.Counter(i[0] for i in written)
+    bad_messages = [
+        message.id for guild_id, message in messages
+        if winners[message.id] != 1 or written_guilds[guild_id] != 1
+    ]
+
+    cog.cog_unload()
+    await bot.close()
+    return {
+        "messages": args.messages,
+        "clicks": len(clicks),
+        "duration": duration,
+        "bad_messages": len(bad_messages),
+        "ack_p50": percentile(ack_latency, 50),
+        "ack_p95": percentile(ack_latency, 95),
+        "ack_p99": percentile(ack_latency, 99),
+        "ack_max": max(ack_latency, default=0.0),
+        "claim_latency": cog.claim_latency.summary(),
+        "loop_lag_p99": percentile(loop_lag, 99),
+        "loop_lag_max": max(loop_lag, default=0.0),
+        "peak_in_flight": peak_in_flight,
+        "edits_scheduled": cog.bong_message_editor.scheduled_count,
+        "edits_issued": calls["edit_original_message"],
+        "api_calls": dict(calls),
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    result = asyncio.run(run_storm(args))
+    print(
+        f"{result['clicks']:,} clicks over {result['messages']:,} messages in {result['duration']:.2f}s\n"
+        f"Winners: {result['messages'] - result['bad_messages']:,}/{result['messages']:,} messages had exactly one\n"
+        f"Click acknowledged: p50 {result['ack_p50'] * 1_000:,.1f}ms, p95 {result['ack_p95'] * 1_000:,.1f}ms, "
+        f"p99 {result['ack_p99'] * 1_000:,.1f}ms, max {result['ack_max'] * 1_000:,.1f}ms\n"
+        f"Click to claim: {result['claim_latency']}\n"
+        f"Contention: {result['peak_in_flight']:,} clicks in flight at peak, event loop lag "
+        f"p99 {result['loop_lag_p99'] * 1_000:,.1f}ms, max {result['loop_lag_max'] * 1_000:,.1f}ms\n"
+        f"Edits: {result['edits_issued']:,} issued for {result['edits_scheduled']:,} scheduled"
+    )
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(result, indent=4))
+    return 1 if result["bad_messages"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100, help="How many bong messages to click")
+    parser.add_argument("--clicks", type=int, default=200, help="How many users click each message")
+    parser.add_argument("--window", type=float, default=200, help="How long each burst of clicks is spread over, in ms")
+    parser.add_argument("--api-latency", type=float, default=50, help="How long each fake Discord API call takes, in ms")
+    parser.add_argument("--db-latency", type=float, default=5, help="How long each fake database query takes, in ms")
+    parser.add_argument("--edit-interval", type=float, default=1.0, help="The minimum time between edits to a message, in seconds")
+    parser.add_argument("--output", help="A file to write the results to as JSON")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,229 @@
+"""
+Benchmark the hourly bong fan-out against a local stand-in for Discord, so
+that nothing real gets sent.
+
+A fake webhook and fun fact server is started in a separate process, with
+configurable latency, error rate and ratelimiting. The bong handler is loaded
+with a set of synthetic guilds pointing at it, then ``do_bong`` is timed. Peak
+memory is measured in a second, untimed bong, as tracing allocations slows the
+bong down too much to time it at the same time.
+
+    python scripts/bench_fanout.py --guilds 1000 10000 100000 --latency 50 --ratelimit-rate 0.01
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import pathlib
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from fakes import FakeBot, make_snowflake  # noqa: E402
+
+
+def run_fake_discord(host: str, port: int, args: argparse.Namespace, ready) -> None:
+    """
+    Run a fake Discord webhook and fun fact API server until killed.
+    """
+
+    counter = itertools.count()
+    stats = {"requests": 0, "errors": 0, "ratelimits": 0}
+
+    async def execute_webhook(request: web.Request) -> web.Response:
+        await request.read()
+        stats["requests"] += 1
+        latency = max(random.gauss(args.latency, args.latency_jitter), 0) / 1_000
+        await asyncio.sleep(latency)
+        roll = random.random()
+        if roll < args.ratelimit_rate:
+            stats["ratelimits"] += 1
+            retry_after = args.retry_after
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                status=429,
+                headers={
+                    "Retry-After": str(retry_after),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset-After": str(retry_after),
+                },
+            )
+        if roll < args.ratelimit_rate + args.error_rate:
+            stats["errors"] += 1
+            return web.json_response({"message": "Internal Server Error"}, status=500)
+        return web.json_response(
+            {"id": str(make_snowflake(next(counter))), "channel_id": request.match_info["webhook_id"]},
+            headers={"X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "2"},
+        )
+
+    async def fun_fact(request: web.Request) -> web.Response:
+        await asyncio.sleep(args.latency / 1_000)
+        return web.json_response({"text": f"Fake fun fact {next(counter)}."})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/api/webhooks/{webhook_id}/{token}", execute_webhook)
+    app.router.add_get("/random.json", fun_fact)
+    app.router.add_get("/stats", get_stats)
+
+    async def main():
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port, backlog=4096).start()
+        ready.set()
+        while True:
+            await asyncio.sleep(3600)
+
+    asyncio.run(main())
+
+
+def make_guild_settings(count: int, base_url: str) -> dict:
+    guild_settings = {}
+    for i in range(count):
+        guild_id = make_snowflake(i)
+        guild_settings[guild_id] = {
+            "guild_id": guild_id,
+            "bong_channel_id": guild_id + 1,
+            "bong_channel_webhook": f"{base_url}/api/webhooks/{guild_id}/token",
+            "bong_role_id": None,
+            "bong_emoji": "\N{BELL}",
+            "bong_offset": None,
+        }
+    return guild_settings
+
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+async def run_benchmark(guild_count: int, base_url: str, args: argparse.Namespace, trace_memory: bool = False) -> dict:
+    # Imported here so that the cog's task loops pick up the running event loop
+    from cogs.bong_handler import BongHandler
+
+    bot = FakeBot({
+        "bong": {
+            "allowed_guild_ids": [],
+            "webhook_concurrency": args.concurrency,
+            "webhook_retry_deadline": args.deadline,
+            "round_journal_path": "",
+            "webhook_warm_url": f"{base_url}/stats",
+            "webhook_warm_connections": args.warm_connections,
+        },
+    })
+    bot.guild_settings = make_guild_settings(guild_count, base_url)
+    cog = BongHandler(bot)
+    cog.bong_scheduler.cancel()
+    cog.fun_fact_refill.cancel()  # The pool is filled from the fake server below instead of the real API
+    await cog.load_bong_roster()
+
+    # Prefetch fun facts from the fake server so the pool is warm like it would be
+    cog.fun_facts.url = f"{base_url}/random.json"
+    await cog.fun_facts.refill(bot.session)
+
+    # Record when each send finishes
+    completions = []
+    original_send = cog.webhook_dispatcher.send
+    start = 0.0
+
+    async def timed_send(*send_args, **send_kwargs):
+        response = await original_send(*send_args, **send_kwargs)
+        completions.append(time.perf_counter() - start)
+        return response
+    cog.webhook_dispatcher.send = timed_send
+
+    # Open connections like we would right before the bong
+    await cog.warm_webhook_client(time.time())
+
+    # Run the bong
+    peak_memory = None
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await cog.do_bong()
+    duration = time.perf_counter() - start
+    if trace_memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    connections = cog.webhook_connections
+
+    cog.cog_unload()
+    await bot.close()
+    return {
+        "guilds": guild_count,
+        "duration": duration,
+        "throughput": guild_count / duration,
+        "p50": percentile(completions, 50),
+        "p99": percentile(completions, 99),
+        "sent": len(cog.bong_rounds),
+        "peak_traced_memory": peak_memory,
+        "connections_new": connections.new,
+        "connections_reused": connections.reused,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    base_url = f"http://{args.host}:{args.port}"
+    async with aiohttp.ClientSession() as session:
+        results = []
+        for guild_count in args.guilds:
+            result = await run_benchmark(guild_count, base_url, args)
+            async with session.get(f"{base_url}/stats") as site:
+                result["server"] = await site.json()
+            if not args.skip_memory:
+                result["peak_traced_memory"] = (await run_benchmark(guild_count, base_url, args, trace_memory=True))["peak_traced_memory"]
+            results.append(result)
+            memory = "" if args.skip_memory else f", peak traced memory {result['peak_traced_memory'] / 1_048_576:,.1f}MiB"
+            print(
+                f"{guild_count:>7,} guilds: {result['duration']:8.2f}s "
+                f"({result['throughput']:,.0f} guilds/s), "
+                f"p50 {result['p50'] * 1_000:,.0f}ms, p99 {result['p99'] * 1_000:,.0f}ms, "
+                f"{result['sent']:,} sent, "
+                f"{result['connections_reused']:,} connections reused and {result['connections_new']:,} new"
+                f"{memory}"
+            )
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1_024
+    print(f"Peak RSS {max_rss:,.1f}MiB, mean throughput {statistics.mean(i['throughput'] for i in results):,.0f} guilds/s")
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8_765)
+    parser.add_argument("--latency", type=float, default=50, help="Mean fake Discord latency, in ms")
+    parser.add_argument("--latency-jitter", type=float, default=10, help="Standard deviation of the latency, in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Chance of a 500 response")
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0, help="Chance of a 429 response")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="The Retry-After on 429 responses, in seconds")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--deadline", type=float, default=30.0)
+    parser.add_argument("--warm-connections", type=int, default=20, help="How many connections to open before the bong")
+    parser.add_argument("--skip-memory", action="store_true", help="Don't run the extra bong that measures peak memory")
+    parser.add_argument("--output", help="A file to write the results to as JSON")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_fake_discord, args=(args.host, args.port, args, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    try:
+        asyncio.run(main(args))
+    finally:
+        server.terminate()
@@ -0,0 +1,79 @@
+"""
+Check that bong partitioning works over several local processes, without
+needing Discord or a database.
+
+Each worker process works out its own slice of a set of synthetic guilds in
+static mode. The slices are checked to make sure every guild is sent by exactly
+one worker, and that it's the worker connected to the guild's shard (which is
+where the clicks on its bong come back to). Workers run with the wrong shards
+are checked to be refused.
+
+    python scripts/check_partitions.py --workers 4 --shards 16 --guilds 100000
+"""
+
+import argparse
+import collections
+import multiprocessing
+import pathlib
+import random
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from cogs.utils.partitioning import BongPartitioner  # noqa: E402
+
+
+def get_shards(worker_index: int, worker_count: int, shard_count: int) -> list:
+    return [i for i in range(shard_count) if i % worker_count == worker_index]
+
+
+def get_slice(args):
+    worker_index, worker_count, shard_count, guild_ids = args
+    partitioner = BongPartitioner(
+        "static",
+        worker_index=worker_index,
+        worker_count=worker_count,
+        shard_ids=get_shards(worker_index, worker_count, shard_count),
+        shard_count=shard_count,
+    )
+    return worker_index, {i for i in guild_ids if partitioner.owns(i)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--guilds", type=int, default=100_000)
+    args = parser.parse_args()
+
+    guild_ids = [random.getrandbits(63) for _ in range(args.guilds)]
+    with multiprocessing.Pool(args.workers) as pool:
+        slices = dict(pool.map(get_slice, [(i, args.workers, args.shards, guild_ids) for i in range(args.workers)]))
+
+    # Make sure every guild is owned exactly once, by the worker with its shard
+    counts = collections.Counter(i for s in slices.values() for i in s)
+    assert len(counts) == len(guild_ids), "Some guilds aren't owned by any worker"
+    assert max(counts.values()) == 1, "Some guilds are owned by more than one worker"
+    for worker_index, guilds in slices.items():
+        shards = set(get_shards(worker_index, args.workers, args.shards))
+        assert all((i >> 22) % args.shards in shards for i in guilds), f"Worker {worker_index} owns guilds off its shards"
+        print(f"Worker {worker_index} owns {len(guilds)} guilds on shards {sorted(shards)}")
+
+    # Make sure a worker with the wrong shards won't start
+    if args.workers > 1:
+        try:
+            BongPartitioner(
+                "static",
+                worker_index=0,
+                worker_count=args.workers,
+                shard_ids=get_shards(1, args.workers, args.shards),
+                shard_count=args.shards,
+            )
+        except ValueError as e:
+            print(f"Worker with the wrong shards refused - {e}")
+        else:
+            raise AssertionError("A worker with the wrong shards was allowed to start")
+
+
+if __name__ == "__main__":
+    main()
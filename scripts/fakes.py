@@ -0,0 +1,174 @@
+"""
+Stand-ins for the parts of the bot that the benchmark scripts don't want to
+talk to for real - the database, the gateway connection, interactions and
+Discord itself.
+"""
+
+import asyncio
+import collections
+import datetime
+import logging
+import pathlib
+import sys
+import time
+import types
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import aiohttp  # noqa: E402
+
+from cogs.utils.bong_rounds import DISCORD_EPOCH, snowflake_time  # noqa: E402
+
+
+def make_snowflake(counter: int = 0) -> int:
+    """
+    Make a Discord snowflake for the current time.
+    """
+
+    return ((int(time.time() * 1_000) - DISCORD_EPOCH) << 22) + (counter % (1 << 22))
+
+
+class FakeDatabase(object):
+    """
+    A database connection that records every query. Selects from
+    ``guild_settings`` return the given guild settings; anything else returns no rows.
+    """
+
+    def __init__(self, queries: list, guild_settings: dict, latency: float = 0.0):
+        self.queries = queries
+        self.guild_settings = guild_settings
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def __call__(self, sql: str, *args):
+        self.queries.append((sql, args,))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if "FROM guild_settings" in sql:
+            return [
+                i for i in self.guild_settings.values()
+                if i.get("bong_channel_id") and i.get("bong_channel_webhook")
+            ]
+        return []
+
+
+class FakeUser(object):
+    """
+    A user clicking a button.
+    """
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMessage(object):
+    """
+    A bong message, with real components so that they can be edited.
+    """
+
+    def __init__(self, id: int, components):
+        self.id = id
+        self.components = components
+
+    @property
+    def created_at(self):
+        return datetime.datetime.fromtimestamp(snowflake_time(self.id), datetime.timezone.utc)
+
+
+class FakeInteractionResponse(object):
+
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def defer_update(self):
+        await self.interaction.api_call("defer_update")
+
+    async def send_message(self, content: str = None, **kwargs):
+        await self.interaction.api_call("send_message")
+        self.interaction.replies.append(content)
+
+
+class FakeFollowup(object):
+
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, content: str = None, **kwargs):
+        await self.interaction.api_call("followup")
+        self.interaction.replies.append(content)
+
+
+class FakeInteraction(object):
+    """
+    A component interaction that records its responses rather than sending
+    them. Each API call takes ``latency`` seconds and is counted in ``calls``.
+    """
+
+    def __init__(
+            self,
+            message: FakeMessage,
+            user: FakeUser,
+            guild_id: int,
+            calls: collections.Counter,
+            latency: float = 0.0,
+            custom_id: str = "BONG MESSAGE BUTTON"):
+        self.message = message
+        self.user = user
+        self.guild_id = guild_id
+        self.custom_id = custom_id
+        self.calls = calls
+        self.latency = latency
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+        self.replies = []
+        self.acknowledged_at = None
+
+    async def api_call(self, name: str):
+        self.calls[name] += 1
+        if name in ("defer_update", "send_message"):
+            self.acknowledged_at = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def edit_original_message(self, **kwargs):
+        await self.api_call("edit_original_message")
+
+
+class FakeBot(object):
+    """
+    Just enough of a bot to load the bong cogs into.
+    """
+
+    def __init__(self, config: dict, db_latency: float = 0.0):
+        self.config = {"token": "fake_token", **config}
+        self.loop = asyncio.get_event_loop()
+        self.session = aiohttp.ClientSession()
+        self.user = types.SimpleNamespace(name="Big Ben", id=1)
+        self.user_agent = "BigBen (benchmark)"
+        self.guild_settings = {}
+        self.shard_ids = None
+        self.shard_count = None
+        self.logger = logging.getLogger("bench")
+        self.queries = []
+        self.db_latency = db_latency
+
+    def database(self):
+        return FakeDatabase(self.queries, self.guild_settings, self.db_latency)
+
+    def dispatch(self, event: str, *args):
+        pass
+
+    async def wait_until_ready(self):
+        pass
+
+    async def close(self):
+        await self.session.close()
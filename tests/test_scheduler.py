@@ -0,0 +1,106 @@
+import asyncio
+import time
+import unittest
+
+from cogs.utils.scheduler import HourlyScheduler
+
+
+class HourlySchedulerTests(unittest.IsolatedAsyncioTestCase):
+    """
+    Runs the scheduler with a one second interval, so that each test only takes
+    a couple of seconds of real time.
+    """
+
+    async def asyncSetUp(self):
+        self.fired = []
+        self.prepared = []
+        self.scheduler = None
+
+    async def asyncTearDown(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+
+    def start(self, **kwargs) -> HourlyScheduler:
+        kwargs.setdefault("interval", 1)
+        kwargs.setdefault("lead", 0.2)
+        kwargs.setdefault("max_sleep", 0.05)
+        self.scheduler = HourlyScheduler(
+            lambda deadline, drift: self.fired.append((deadline, drift, time.time(),)),
+            prepare=self.prepared.append,
+            **kwargs,
+        )
+        self.scheduler.start()
+        return self.scheduler
+
+    async def sleep_until_after_deadline(self, after: float = 0.1):
+        await asyncio.sleep((-time.time() % 1) + after)
+
+    async def test_fires_on_deadline_with_little_drift(self):
+        await self.sleep_until_after_deadline(0.5)  # Too late to catch up on the last deadline
+        self.start(catch_up=0.25)
+        await asyncio.sleep(1.6)
+        self.assertGreaterEqual(len(self.fired), 1)
+        for deadline, drift, _ in self.fired:
+            self.assertEqual(deadline % 1, 0)
+            self.assertLess(drift, 0.05)
+        self.assertIn(self.fired[0][0], self.prepared)
+
+    async def test_catches_up_on_start(self):
+        await self.sleep_until_after_deadline(0.1)
+        started = time.time()
+        self.start(catch_up=0.5)
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(self.fired), 1)
+        deadline, drift, fired_at = self.fired[0]
+        self.assertEqual(deadline, started // 1)
+        self.assertLess(fired_at - started, 0.05)
+        self.assertNotIn(deadline, self.prepared)
+
+    async def test_skips_on_start_past_catch_up(self):
+        await self.sleep_until_after_deadline(0.5)
+        started = time.time()
+        self.start(catch_up=0.25)
+        await asyncio.sleep(0.3)
+        self.assertEqual(self.fired, [])
+        await asyncio.sleep(0.4)
+        self.assertEqual([i[0] for i in self.fired], [started // 1 + 1])
+
+    async def test_skips_deadline_past_catch_up(self):
+        await self.sleep_until_after_deadline(0.5)
+        self.start(catch_up=0.1)
+        await asyncio.sleep(0.3)  # Right before the next deadline
+        blocked = time.time() // 1 + 1
+        time.sleep(0.8)  # Block the event loop over the deadline for longer than the catch up
+        await asyncio.sleep(1.0)
+        deadlines = [i[0] for i in self.fired]
+        self.assertNotIn(blocked, deadlines)
+        self.assertIn(blocked + 1, deadlines)
+
+    async def test_add_and_remove_slots(self):
+        await self.sleep_until_after_deadline(0.7)
+        scheduler = self.start(catch_up=0.05, offsets=(0,))
+        scheduler.set_offsets({0, 0.5})
+        await asyncio.sleep(1.0)
+        slots = {i[0] % 1 for i in self.fired}
+        self.assertEqual(slots, {0, 0.5})
+
+        scheduler.set_offsets({0.5})
+        self.fired.clear()
+        await asyncio.sleep(1.5)
+        slots = {i[0] % 1 for i in self.fired}
+        self.assertEqual(slots, {0.5})
+
+    async def test_readded_slot_doesnt_fire_twice(self):
+        await self.sleep_until_after_deadline(0.05)
+        scheduler = self.start(catch_up=0.9, lead=0.5, offsets=(0,))
+        await asyncio.sleep(0.05)
+        scheduler.set_offsets({0.5})  # Removed before its next prepare
+        await asyncio.sleep(0.5)
+        scheduler.set_offsets({0, 0.5})  # And added back while its last deadline could still be caught up on
+        await asyncio.sleep(0.1)
+        deadlines = [i[0] for i in self.fired if i[0] % 1 == 0]
+        self.assertEqual(len(deadlines), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()